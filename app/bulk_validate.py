@@ -0,0 +1,220 @@
+"""
+Headless bulk validation of onboarding documents.
+
+Validates every document in a directory or manifest with a process pool, checks
+nursing licenses against the registry, updates each candidate's checklist and
+writes one JSON line per document as it completes. Re-running with the same
+output file skips documents that were already processed successfully.
+
+Usage:
+    python -m app.bulk_validate scans/ --output results.jsonl
+    python -m app.bulk_validate manifest.csv --output results.jsonl --workers 8
+
+A directory's first-level subfolders are candidate ids (scans/<candidate>/<file>);
+files directly in it go to --candidate-id. A manifest is a CSV with 'path' and
+'candidate_id' columns, or JSON lines with the same keys; relative paths are
+resolved against the manifest's folder.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from app.checklist_state_manager import DEFAULT_CANDIDATE_ID, update_candidate_checklist
+from app.onboarding_checklist import ONBOARDING_CHECKLIST_TEMPLATE
+from app.db_utils import load_nursing_license_registry
+from app.pipeline import process_document
+from app.report_cache import document_cache_key
+
+SUPPORTED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg"}
+BULK_MAX_WORKERS = int(os.getenv("BULK_MAX_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# Registry loaded once per worker process by _init_worker
+_worker_registry = None
+
+
+def discover_inputs(source, default_candidate_id=DEFAULT_CANDIDATE_ID):
+    """
+    List the documents to validate.
+
+    Args:
+        source (Path): A directory, or a .csv / .jsonl manifest.
+
+    Returns:
+        list: (path, candidate_id) tuples in a stable order.
+    """
+    source = Path(source)
+    if source.is_dir():
+        inputs = []
+        for path in sorted(source.rglob("*")):
+            if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
+                relative = path.relative_to(source)
+                candidate_id = relative.parts[0] if len(relative.parts) > 1 else default_candidate_id
+                inputs.append((path, candidate_id))
+        return inputs
+
+    with open(source, newline="", encoding="utf-8") as f:
+        if source.suffix.lower() == ".csv":
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    inputs = []
+    for row in rows:
+        path = Path(row["path"])
+        if not path.is_absolute():
+            path = source.parent / path
+        inputs.append((path, (row.get("candidate_id") or "").strip() or default_candidate_id))
+    return inputs
+
+
+def load_processed(output_path):
+    """
+    Read an earlier run's output and return the keys of documents that need no rerun.
+
+    Documents whose validation returned an error are not included, so they are retried.
+    """
+    processed = set()
+    if not output_path.exists():
+        return processed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by an interruption
+            if result.get("status") != "ERROR":
+                processed.add((result.get("path"), result.get("candidate_id"), result.get("sha256")))
+    return processed
+
+
+def _init_worker():
+    global _worker_registry
+    _worker_registry = load_nursing_license_registry()
+
+
+def validate_one(path, candidate_id, sha256):
+    """
+    Validate one document in a worker process and apply it to the candidate's checklist.
+
+    Only known document types are applied to the checklist, as in the UI. Any exception
+    is recorded as an ERROR result so the rest of the run continues.
+
+    Returns:
+        dict: The JSON-serializable result line for the document.
+    """
+    start = time.perf_counter()
+    result = {"path": path, "candidate_id": candidate_id, "sha256": sha256}
+    try:
+        report = process_document(path, _worker_registry)
+        if "error" in report:
+            result["status"] = "ERROR"
+        else:
+            document_type = report.get("document_type")
+            validation_results = report.get("validation", {})
+            failed = [field for field, value in validation_results.items() if value.get("status") != "PASS"]
+            result.update({"document_type": document_type, "status": "FAIL" if failed else "PASS", "failed_fields": failed})
+            if document_type in ONBOARDING_CHECKLIST_TEMPLATE:
+                update_candidate_checklist(candidate_id, document_type, validation_results, notes=report.get("notes", ""))
+    except Exception as e:
+        result["status"] = "ERROR"
+        report = {"error": f"Validation failed: {type(e).__name__}: {e}"}
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    result["report"] = report
+    return result
+
+
+def run(inputs, output, max_workers=BULK_MAX_WORKERS, processed=frozenset()):
+    """
+    Validate inputs with a process pool, writing each result line to output as it completes.
+
+    At most twice max_workers documents are queued at a time, so large batches do
+    not all sit in the pool's queue at once.
+
+    Returns:
+        dict: Number of documents per status, plus 'SKIPPED'.
+    """
+    counts = {"PASS": 0, "FAIL": 0, "ERROR": 0, "SKIPPED": 0}
+    pending = iter(inputs)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        in_flight = set()
+        in_flight_inputs = {}
+
+        def submit_next():
+            for path, candidate_id in pending:
+                if not path.exists():
+                    write({"path": str(path), "candidate_id": candidate_id, "sha256": None,
+                           "status": "ERROR", "report": {"error": f"File not found: {path}"}})
+                    continue
+                sha256 = document_cache_key(path)
+                if (str(path), candidate_id, sha256) in processed:
+                    counts["SKIPPED"] += 1
+                    continue
+                future = executor.submit(validate_one, str(path), candidate_id, sha256)
+                in_flight.add(future)
+                in_flight_inputs[future] = (str(path), candidate_id, sha256)
+                return True
+            return False
+
+        def write(result):
+            counts[result["status"]] += 1
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+        while len(in_flight) < 2 * max_workers and submit_next():
+            pass
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # e.g. a worker process died; the document is retried on the next run
+                    path, candidate_id, sha256 = in_flight_inputs[future]
+                    result = {"path": path, "candidate_id": candidate_id, "sha256": sha256,
+                              "status": "ERROR", "report": {"error": f"Worker failed: {type(e).__name__}: {e}"}}
+                del in_flight_inputs[future]
+                write(result)
+                submit_next()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate onboarding documents in bulk without the Streamlit UI.")
+    parser.add_argument("source", type=Path, help="Directory of documents, or a .csv/.jsonl manifest")
+    parser.add_argument("--output", "-o", type=Path, help="JSON lines output; appended to and used to resume")
+    parser.add_argument("--workers", type=int, default=BULK_MAX_WORKERS, help="Worker processes")
+    parser.add_argument("--candidate-id", default=DEFAULT_CANDIDATE_ID,
+                        help="Candidate for documents not assigned one by folder or manifest")
+    args = parser.parse_args(argv)
+
+    inputs = [(path.resolve(), candidate_id) for path, candidate_id in discover_inputs(args.source, args.candidate_id)]
+    processed = load_processed(args.output) if args.output else set()
+
+    start = time.perf_counter()
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        counts = run(inputs, output, max(1, args.workers), processed)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun with the same --output to resume.", file=sys.stderr)
+        return 130
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(
+        f"{len(inputs)} document(s) in {time.perf_counter() - start:.1f}s: "
+        f"{counts['PASS']} passed, {counts['FAIL']} with issues, {counts['ERROR']} errors, "
+        f"{counts['SKIPPED']} already processed.",
+        file=sys.stderr,
+    )
+    return 1 if counts["ERROR"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
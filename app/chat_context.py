@@ -0,0 +1,143 @@
+import json
+import math
+import os
+import re
+from pathlib import Path
+from typing import List
+
+# Context window of the chat model and the share of it reserved for the reply
+CHAT_CONTEXT_WINDOW_TOKENS = int(os.getenv("CHAT_CONTEXT_WINDOW_TOKENS", "8192"))
+CHAT_RESPONSE_RESERVE_TOKENS = int(os.getenv("CHAT_RESPONSE_RESERVE_TOKENS", "1024"))
+CHAT_CONTEXT_TOKEN_BUDGET = int(
+    os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", str(CHAT_CONTEXT_WINDOW_TOKENS - CHAT_RESPONSE_RESERVE_TOKENS))
+)
+# Tokens allowed for the rolling summary of older turns
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "400"))
+# Messages kept in session memory; older ones are spilled to disk
+CHAT_HISTORY_MAX_IN_MEMORY = int(os.getenv("CHAT_HISTORY_MAX_IN_MEMORY", "40"))
+CHAT_HISTORY_SPILL_DIR = Path(os.getenv("CHAT_HISTORY_SPILL_DIR", "data/chat_history"))
+
+# Per-message overhead of the chat format (role and separators)
+_MESSAGE_OVERHEAD_TOKENS = 4
+_SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the token count of text without a model-specific tokenizer.
+
+    Counts each punctuation mark as one token and each word as one token per four
+    characters, which slightly overestimates typical BPE tokenizers.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in re.findall(r"\w+|[^\w\s]", text or ""))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text so count_tokens(result) <= max_tokens, keeping its start and marking the cut with '…'."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    used, end = 1, 0  # one token for the marker
+    for match in re.finditer(r"\w+|[^\w\s]", text):
+        used += max(1, math.ceil(len(match.group(0)) / 4))
+        if used > max_tokens:
+            break
+        end = match.end()
+    return text[:end] + "…"
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def _gist(text: str, limit: int = 160) -> str:
+    """First sentence of text, shortened to at most limit characters."""
+    text = re.sub(r"```.*?```", "", text or "", flags=re.DOTALL)
+    text = " ".join(text.split())
+    sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1].rstrip() + "…"
+
+
+def summarize_turns(messages: List[dict]) -> List[str]:
+    """Extractive one-line summaries of chat messages."""
+    labels = {"user": "User asked", "assistant": "Assistant replied"}
+    return [f"{labels.get(m['role'], m['role'])}: {_gist(m['content'])}" for m in messages if m.get("content")]
+
+
+class ChatContextManager:
+    """
+    Conversation state for one chat session, packed into a token budget per request.
+
+    Keeps at most max_in_memory messages. Older messages are appended to a JSONL
+    file under spill_dir and folded into a rolling extractive summary. When building
+    a request, the system prompt always goes in, then the summary, then as many of
+    the most recent messages as fit in token_budget; messages that do not fit are
+    summarized as well. The newest message is always included, truncated if it
+    does not fit on its own.
+    """
+
+    def __init__(self, session_id: str, token_budget: int = CHAT_CONTEXT_TOKEN_BUDGET,
+                 max_in_memory: int = CHAT_HISTORY_MAX_IN_MEMORY, spill_dir=CHAT_HISTORY_SPILL_DIR,
+                 summary_max_tokens: int = CHAT_SUMMARY_MAX_TOKENS):
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self.max_in_memory = max(2, max_in_memory)
+        self.spill_path = Path(spill_dir) / f"{session_id}.jsonl"
+        self.summary_max_tokens = summary_max_tokens
+        self.history: List[dict] = []
+        self.summary_lines: List[str] = []
+
+    def append(self, role: str, content: str):
+        """Add a message, spilling the oldest messages to disk when over the in-memory cap."""
+        self.history.append({"role": role, "content": content})
+        if len(self.history) > self.max_in_memory:
+            # Spill a quarter of the cap at once so appends do not write to disk every turn
+            spill_count = len(self.history) - self.max_in_memory + self.max_in_memory // 4
+            spilled, self.history = self.history[:spill_count], self.history[spill_count:]
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for message in spilled:
+                    f.write(json.dumps(message) + "\n")
+            self.summary_lines = self._cap_summary(self.summary_lines + summarize_turns(spilled))
+
+    def _cap_summary(self, lines: List[str]) -> List[str]:
+        """Drop the oldest summary lines until the summary fits summary_max_tokens."""
+        lines = list(lines)
+        while lines and sum(count_tokens(line) for line in lines) > self.summary_max_tokens:
+            lines.pop(0)
+        return lines
+
+    def build_messages(self, system_prompt: str) -> List[dict]:
+        """Messages for the next request: system prompt, summary of older turns and recent history within budget."""
+        system = {"role": "system", "content": system_prompt}
+        summary_reserve = count_tokens(_SUMMARY_HEADER) + self.summary_max_tokens + _MESSAGE_OVERHEAD_TOKENS
+        remaining = self.token_budget - message_tokens(system) - summary_reserve
+
+        # The newest message (normally the question being asked) always goes in verbatim,
+        # cut to the budget if it is too long on its own; older turns fill what is left
+        recent = []
+        if self.history:
+            newest = self.history[-1]
+            if message_tokens(newest) > remaining:
+                content_budget = max(1, remaining - _MESSAGE_OVERHEAD_TOKENS)
+                newest = {**newest, "content": truncate_to_tokens(newest["content"], content_budget)}
+            recent.append(newest)
+            remaining -= message_tokens(newest)
+        for message in reversed(self.history[:-1]):
+            cost = message_tokens(message)
+            if cost > remaining:
+                break
+            recent.append(message)
+            remaining -= cost
+        recent.reverse()
+
+        # Older in-memory turns that did not fit are folded into the summary too
+        dropped = self.history[:len(self.history) - len(recent)]
+        summary_lines = self._cap_summary(self.summary_lines + summarize_turns(dropped))
+
+        messages = [system]
+        if summary_lines:
+            messages.append({
+                "role": "system",
+                "content": _SUMMARY_HEADER + "\n".join(summary_lines)
+            })
+        return messages + recent
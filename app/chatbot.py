@@ -1,20 +1,40 @@
 import os
+import time
 import requests
 from dotenv import load_dotenv
 from typing import List
 import json
+from app.http_client import get_http_client
+from app.kb_store import ValidationKBStore, get_kb_store
+from app.llm_cache import get_llm_cache
+from app.metrics import record, span
 
 # Load environment variables from .env file
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_API_URL = os.getenv("GROQ_API_BASE", "https://api.groq.com/openai/v1").rstrip("/") + "/chat/completions"
 
-def query_groq_llama(prompt: str, model: str = "llama3-70b-8192") -> str:
+GROQ_SYSTEM_PROMPT = "You are a helpful HR assistant helping users with onboarding issues."
+
+def query_groq_llama(prompt: str, model: str = "llama3-70b-8192", temperature: float = 0.4) -> str:
     """
     Send a chat completion request to Groq API with the given prompt and model,
     returning the assistant's response text.
+
+    Responses are cached per (prompt, model, temperature), and concurrent identical
+    requests share one API call. Error responses are not cached.
     """
-    url = "https://api.groq.com/openai/v1/chat/completions"
+    return get_llm_cache().get_or_compute(
+        GROQ_SYSTEM_PROMPT + "\n" + prompt,
+        model,
+        temperature,
+        lambda: _query_groq_llama_uncached(prompt, model, temperature),
+        cacheable=lambda response: not response.startswith("[Error]"),
+    )
+
+def _query_groq_llama_uncached(prompt: str, model: str, temperature: float) -> str:
+    url = GROQ_API_URL
     headers = {
         "Authorization": f"Bearer {GROQ_API_KEY}",
         "Content-Type": "application/json"
@@ -22,33 +42,106 @@ def query_groq_llama(prompt: str, model: str = "llama3-70b-8192") -> str:
     payload = {
         "model": model,
         "messages": [
-            {"role": "system", "content": "You are a helpful HR assistant helping users with onboarding issues."},
+            {"role": "system", "content": GROQ_SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
-        "temperature": 0.4
+        "temperature": temperature
     }
 
-    response = requests.post(url, headers=headers, json=payload)
+    try:
+        with span("groq_chat") as chat_span:
+            response = get_http_client().post("groq", url, headers=headers, json=payload)
+            chat_span.add_bytes(sent=len(response.request.body or b""), received=len(response.content))
+            if response.status_code != 200:
+                chat_span.fail()
+    except requests.RequestException as e:
+        return f"[Error] Groq API call failed: {e}"
 
     if response.status_code == 200:
         return response.json()["choices"][0]["message"]["content"].strip()
     else:
         return f"[Error] Groq API call failed: {response.status_code} - {response.text}"
 
-def load_validation_kb(kb_path: str = "app/kb/validation_kb.json") -> List[dict]:
+def stream_groq_chat(messages: List[dict], model: str = "llama3-8b-8192", temperature: float = 0.7,
+                     timings: dict = None):
+    """
+    Stream a Groq chat completion, yielding content fragments as they arrive.
+
+    Uses server-sent events ("stream": true). If timings is given, it receives
+    'ttft_ms' (time to first token) once the first fragment arrives and 'total_ms'
+    when the stream ends.
+
+    Raises:
+        requests.RequestException: If the request fails or returns a non-200 status.
+    """
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+    received = 0
+    outcome = "error"
+    response = get_http_client().post(
+        "groq",
+        GROQ_API_URL,
+        headers={
+            "Authorization": f"Bearer {GROQ_API_KEY}",
+            "Content-Type": "application/json"
+        },
+        json={
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": True
+        },
+        stream=True
+    )
+    try:
+        if response.status_code != 200:
+            raise requests.HTTPError(
+                f"Groq API call failed: {response.status_code} - {response.text}", response=response
+            )
+        for line in response.iter_lines(decode_unicode=True):
+            received += len(line.encode("utf-8")) + 1 if line else 1
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or [{}]
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                if "ttft_ms" not in timings:
+                    timings["ttft_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                    record("groq_chat_first_token", timings["ttft_ms"] / 1000)
+                yield content
+        outcome = "ok"
+    finally:
+        response.close()
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        record("groq_chat_stream", timings["total_ms"] / 1000, len(response.request.body or b""), received, outcome)
+
+def load_validation_kb(kb_path: str = None) -> List[dict]:
     """
-    Load the validation knowledge base (KB) from a JSON file.
+    Return the validation knowledge base (KB) entries.
+
+    Served from the process-wide KB store, which reads the JSON file once and
+    reloads it only when it changes.
     """
-    with open(kb_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return get_kb_store(kb_path).entries()
 
-def get_kb_entries_for_issues(kb: List[dict], issue_codes: List[str]) -> List[dict]:
+def get_kb_entries_for_issues(kb, issue_codes: List[str]) -> List[dict]:
     """
-    Filter and return KB entries whose 'issue_code' matches any code in issue_codes.
+    Return KB entries whose 'issue_code' matches any code in issue_codes.
+
+    kb may be a ValidationKBStore (O(1) lookup per code) or a list of entries.
     """
+    if isinstance(kb, ValidationKBStore):
+        return kb.get_many(issue_codes)
+
+    index = {}
+    for entry in kb:
+        index.setdefault(entry.get("issue_code"), []).append(entry)
     matched_entries = []
     for code in issue_codes:
-        matched_entries.extend([entry for entry in kb if entry.get("issue_code") == code])
+        matched_entries.extend(index.get(code, []))
     return matched_entries
 
 def build_prompt_from_kb_entries(kb_entries: List[dict]) -> str:
@@ -125,8 +218,8 @@ def get_chatbot_response(issue_codes: List[str], use_template: bool = False) ->
     Returns:
     - Response string suitable for displaying to user.
     """
-    kb = load_validation_kb()
-    entries = get_kb_entries_for_issues(kb, issue_codes)
+    # The prompt depends only on the set of codes, so normalize order and duplicates for the response cache
+    entries = get_kb_entries_for_issues(get_kb_store(), sorted(set(issue_codes)))
 
     if use_template:
         return generate_human_friendly_message(entries)
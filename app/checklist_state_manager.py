@@ -1,29 +1,155 @@
 # app/checklist_state_manager.py
 
-import json
+import copy
 import os
-from app.onboarding_checklist import ONBOARDING_CHECKLIST_TEMPLATE
+import threading
+import time
+from pathlib import Path
 
-CHECKLIST_FILE_PATH = "checklist.json"  # You can change this path if needed
+from app.metrics import span
+from app.onboarding_checklist import ONBOARDING_CHECKLIST_TEMPLATE, update_checklist
+from app.sqlite_utils import thread_transaction
 
+# SQLite database holding every candidate's checklist
+CHECKLIST_DB_PATH = Path(os.getenv("CHECKLIST_DB_PATH", "data/checklists.db"))
+DEFAULT_CANDIDATE_ID = "default"
 
-def load_checklist():
+
+class ChecklistStore:
+    """
+    Per-candidate onboarding checklists in SQLite (WAL mode).
+
+    Each document's status and notes, and each required field's status, is its own
+    row keyed by candidate, so updates touch only the rows that changed and run in
+    their own transaction. WAL lets readers proceed while another session writes.
+
+    Candidate ids are not authenticated: whoever knows an id can read and update
+    that candidate's checklist (the UI lets users type any id).
+    """
+
+    def __init__(self, db_path=CHECKLIST_DB_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checklist_documents ("
+                "candidate_id TEXT NOT NULL, doc_type TEXT NOT NULL, status TEXT NOT NULL, notes TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (candidate_id, doc_type)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checklist_fields ("
+                "candidate_id TEXT NOT NULL, doc_type TEXT NOT NULL, field TEXT NOT NULL, status TEXT NOT NULL, "
+                "PRIMARY KEY (candidate_id, doc_type, field)) WITHOUT ROWID"
+            )
+
+    def _conn(self):
+        return thread_transaction(self._local, self.db_path)
+
+    def load(self, candidate_id=DEFAULT_CANDIDATE_ID):
+        """Return the candidate's checklist: the template overlaid with any stored state."""
+        checklist = copy.deepcopy(ONBOARDING_CHECKLIST_TEMPLATE)
+        with self._conn() as conn:
+            self._read_into(conn, candidate_id, checklist)
+        return checklist
+
+    def _read_into(self, conn, candidate_id, checklist, doc_type=None):
+        doc_filter = " AND doc_type = ?" if doc_type else ""
+        params = (candidate_id, doc_type) if doc_type else (candidate_id,)
+        for doc, status, notes in conn.execute(
+            "SELECT doc_type, status, notes FROM checklist_documents WHERE candidate_id = ?" + doc_filter, params
+        ):
+            entry = checklist.setdefault(doc, {"status": status, "notes": notes, "required_fields": {}})
+            entry["status"], entry["notes"] = status, notes
+        for doc, field, status in conn.execute(
+            "SELECT doc_type, field, status FROM checklist_fields WHERE candidate_id = ?" + doc_filter, params
+        ):
+            if doc in checklist:
+                checklist[doc]["required_fields"][field] = status
+
+    def _write_document(self, conn, candidate_id, doc_type, entry, previous=None):
+        """Upsert one document's row and the field rows that differ from previous."""
+        if previous is None or (entry["status"], entry["notes"]) != (previous["status"], previous["notes"]):
+            conn.execute(
+                "INSERT OR REPLACE INTO checklist_documents VALUES (?, ?, ?, ?, ?)",
+                (candidate_id, doc_type, entry["status"], entry["notes"] or "", time.time()),
+            )
+        previous_fields = previous["required_fields"] if previous else {}
+        changed = [
+            (candidate_id, doc_type, field, status)
+            for field, status in entry["required_fields"].items()
+            if previous_fields.get(field) != status
+        ]
+        conn.executemany("INSERT OR REPLACE INTO checklist_fields VALUES (?, ?, ?, ?)", changed)
+
+    def save(self, checklist, candidate_id=DEFAULT_CANDIDATE_ID):
+        """Store a whole checklist for the candidate in one transaction."""
+        with self._conn() as conn:
+            for doc_type, entry in checklist.items():
+                self._write_document(conn, candidate_id, doc_type, entry)
+
+    def update(self, candidate_id, document_type, validation_results, notes=None):
+        """
+        Apply validation results for one document with update_checklist and store only what changed.
+
+        Re-validating a document replaces its notes rather than appending to them.
+
+        Returns:
+            dict: The candidate's full checklist after the update.
+
+        Raises:
+            ValueError: If document_type is not an ONBOARDING_CHECKLIST_TEMPLATE document.
+        """
+        if document_type not in ONBOARDING_CHECKLIST_TEMPLATE:
+            raise ValueError(f"Unknown document type for the onboarding checklist: {document_type!r}")
+        with self._conn() as conn:
+            checklist = copy.deepcopy(ONBOARDING_CHECKLIST_TEMPLATE)
+            self._read_into(conn, candidate_id, checklist, doc_type=document_type)
+            previous = copy.deepcopy(checklist.get(document_type))
+            if document_type in checklist:
+                checklist[document_type]["notes"] = ""
+            checklist = update_checklist(checklist, document_type, validation_results, notes=notes)
+            self._write_document(conn, candidate_id, document_type, checklist[document_type], previous)
+        return self.load(candidate_id)
+
+    def candidates(self):
+        """Ids of all candidates with a stored checklist."""
+        with self._conn() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT candidate_id FROM checklist_documents")]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_checklist_store():
+    """Return the process-wide ChecklistStore, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ChecklistStore()
+        return _store
+
+
+def load_checklist(candidate_id=DEFAULT_CANDIDATE_ID):
+    """
+    Loads the onboarding checklist for a candidate.
+    If nothing is stored yet, returns a fresh copy of the template.
+    """
+    return get_checklist_store().load(candidate_id)
+
+
+def save_checklist(checklist, candidate_id=DEFAULT_CANDIDATE_ID):
     """
-    Loads the onboarding checklist from a JSON file.
-    If the file doesn't exist, returns a fresh copy of the template.
+    Saves the candidate's onboarding checklist.
     """
-    if os.path.exists(CHECKLIST_FILE_PATH):
-        with open(CHECKLIST_FILE_PATH, "r") as f:
-            return json.load(f)
-    else:
-        # Return a deep copy of the template to avoid mutation issues
-        import copy
-        return copy.deepcopy(ONBOARDING_CHECKLIST_TEMPLATE)
+    get_checklist_store().save(checklist, candidate_id)
 
 
-def save_checklist(checklist):
+def update_candidate_checklist(candidate_id, document_type, validation_results, notes=None):
     """
-    Saves the current onboarding checklist to disk as JSON.
+    Update one document of a candidate's checklist from validation results and persist it.
+    Returns the candidate's full checklist.
     """
-    with open(CHECKLIST_FILE_PATH, "w") as f:
-        json.dump(checklist, f, indent=2)
+    with span("update_checklist"):
+        return get_checklist_store().update(candidate_id, document_type, validation_results, notes=notes)
@@ -1,13 +1,29 @@
+import difflib
 import json
+import os
+import sqlite3
+import threading
 from pathlib import Path
 
+import numpy as np
+
+LICENSE_DB_JSON_PATH = Path(__file__).parent / "nursing_license_db.json"
+# Compiled, indexed form of the JSON database (see compile_nursing_license_db)
+LICENSE_DB_COMPILED_PATH = Path(__file__).parent / "nursing_license_db.sqlite"
+# Bytes of the compiled database mapped into memory; pages are shared between processes via the OS page cache
+LICENSE_DB_MMAP_SIZE = int(os.getenv("LICENSE_DB_MMAP_SIZE", str(1 << 30)))
+# Bumped whenever the compiled layout changes; stale compiled files are ignored
+LICENSE_DB_SCHEMA_VERSION = 2
+# Upper bound on records scored when looking for the closest record to a mismatch
+MAX_MATCH_CANDIDATES = int(os.getenv("LICENSE_MAX_MATCH_CANDIDATES", "200"))
+
 def load_nursing_license_db():
     """
     Load the nursing license database JSON file from the app folder.
     Returns:
         data (list or dict): Parsed JSON data representing nursing licenses.
     """
-    db_path = Path(__file__).parent / "nursing_license_db.json"
+    db_path = LICENSE_DB_JSON_PATH
     with open(db_path, "r", encoding="utf-8") as f:
         data = json.load(f)
     return data
@@ -30,6 +46,305 @@ def normalize_date(date_str):
             continue
     return ""
 
+# Fields compared between an extracted document and a registry record, in the
+# order mismatches are reported: (mismatch key, record key, normalizer).
+LICENSE_FIELDS = (
+    ("name", "full_name", normalize_str),
+    ("date_of_birth", "date_of_birth", normalize_date),
+    ("license_number", "license_number", normalize_str),
+    ("gender", "gender", normalize_str),
+    ("valid_until", "valid_until", normalize_date),
+    ("field_of_practice", "field_of_practice", normalize_str),
+)
+
+def normalize_record(record):
+    """Normalize a registry record into a tuple ordered like LICENSE_FIELDS."""
+    return tuple(normalize(record.get(key) or "") for _, key, normalize in LICENSE_FIELDS)
+
+def normalize_extracted_info(extracted_info):
+    """Normalize extracted document fields into a tuple ordered like LICENSE_FIELDS."""
+    return (
+        normalize_str(extracted_info.get("name") or extracted_info.get("full_name")),
+        normalize_date(extracted_info.get("date_of_birth", "")),
+        normalize_str(extracted_info.get("license_number", "")),
+        normalize_str(extracted_info.get("gender", "")),
+        normalize_date(extracted_info.get("valid_until", "")),
+        normalize_str(extracted_info.get("to_practice_as") or extracted_info.get("field_of_practice")),
+    )
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"), **dict.fromkeys("dt", "3"),
+    "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+}
+
+def soundex(word):
+    """American Soundex code of a word, e.g. 'Sharma' -> 's650'. Empty string for non-alphabetic input."""
+    letters = [c for c in word.lower() if "a" <= c <= "z"]
+    if not letters:
+        return ""
+    code = letters[0]
+    last = _SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES.get(c, "")
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in "hw":
+            last = digit
+    return code.ljust(4, "0")
+
+def _deletion_neighbours(value):
+    """The value plus every string obtained by deleting one character (symmetric-delete edit distance)."""
+    return {value} | {value[:i] + value[i + 1:] for i in range(len(value))}
+
+def blocking_keys(raw_name, norm):
+    """
+    Candidate-blocking keys for a record or extracted document.
+
+    Records sharing at least one key with a query are scored as possible closest
+    matches: Soundex codes of the name tokens, the date of birth (also with day and
+    month swapped, for dd/mm vs mm/dd confusion) and one-character-deletion
+    neighbours of the license number, which link numbers within a small edit distance.
+    """
+    keys = {"n:" + soundex(token) for token in re.findall(r"[a-z]+", (raw_name or "").lower())}
+    dob = norm[1]
+    if dob:
+        keys.add("d:" + dob)
+        year, month, day = dob.split("-")
+        if day <= "12" and day != month:
+            keys.add(f"d:{year}-{day}-{month}")
+    if norm[2]:
+        keys.update("l:" + neighbour for neighbour in _deletion_neighbours(norm[2]) if neighbour)
+    keys.discard("n:")
+    return keys
+
+def _similarity(a, b):
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+class NursingLicenseRegistry:
+    """
+    In-memory nursing license registry.
+
+    Every record is normalized once when the registry is built, and hash indexes
+    on license number and on (name, date of birth) make exact lookups O(1). A
+    blocking index (see blocking_keys) narrows the closest-record search.
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.normalized = [normalize_record(record) for record in self.records]
+        self._by_license = {}
+        self._by_name_dob = {}
+        self._blocks = {}
+        for idx, (record, norm) in enumerate(zip(self.records, self.normalized)):
+            self._by_license.setdefault(norm[2], []).append(idx)
+            self._by_name_dob.setdefault((norm[0], norm[1]), []).append(idx)
+            for key in blocking_keys(record.get("full_name"), norm):
+                self._blocks.setdefault(key, []).append(idx)
+
+    def __len__(self):
+        return len(self.records)
+
+    def normalized_matrix(self, ids):
+        """
+        Normalized fields of the given records as an (len(ids), 6) string array.
+
+        Built per call from the requested rows only, so the registry never holds a
+        fixed-width copy of every record.
+        """
+        rows = [self.normalized[idx] for idx in ids]
+        return np.array(rows, dtype=np.str_).reshape(len(rows), len(LICENSE_FIELDS))
+
+    def record(self, idx):
+        return self.records[idx]
+
+    def normalized_record(self, idx):
+        return self.normalized[idx]
+
+    def exact_candidates(self, norm):
+        """Return ids of records that could match the normalized fields exactly, in registry order."""
+        if norm[2]:
+            return self._by_license.get(norm[2], [])
+        return self._by_name_dob.get((norm[0], norm[1]), [])
+
+    def match_candidates(self, keys, limit=MAX_MATCH_CANDIDATES):
+        """Return up to limit record ids sharing the most blocking keys, in registry order on ties."""
+        counts = {}
+        for key in keys:
+            for idx in self._blocks.get(key, ()):
+                counts[idx] = counts.get(idx, 0) + 1
+        return sorted(counts, key=lambda idx: (-counts[idx], idx))[:limit]
+
+
+_NORMALIZED_COLUMNS = ("n_name", "n_dob", "n_license", "n_gender", "n_valid_until", "n_field")
+_RECORD_KEYS = tuple(key for _, key, _ in LICENSE_FIELDS)
+
+def compile_nursing_license_db(json_path=LICENSE_DB_JSON_PATH, db_path=LICENSE_DB_COMPILED_PATH):
+    """
+    Compile the JSON nursing license database into an indexed SQLite file.
+
+    Each record is stored with its raw and normalized fields, and the normalized
+    license number and (name, date of birth) are indexed. The file is written next
+    to its destination and swapped in atomically, so running workers keep reading
+    the previous version until they reopen it.
+
+    Returns:
+        int: Number of records compiled.
+    """
+    db_path = Path(db_path)
+    tmp_path = db_path.with_name(db_path.name + ".tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute(
+            "CREATE TABLE licenses (id INTEGER PRIMARY KEY, "
+            + ", ".join(_RECORD_KEYS) + ", " + ", ".join(_NORMALIZED_COLUMNS) + ", extra TEXT)"
+        )
+        rows = []
+        for idx, record in enumerate(records):
+            extra = {k: v for k, v in record.items() if k not in _RECORD_KEYS}
+            rows.append(
+                (idx,)
+                + tuple(record.get(key) for key in _RECORD_KEYS)
+                + normalize_record(record)
+                + (json.dumps(extra) if extra else None,)
+            )
+        placeholders = ", ".join("?" * (2 + len(_RECORD_KEYS) + len(_NORMALIZED_COLUMNS)))
+        conn.executemany(f"INSERT INTO licenses VALUES ({placeholders})", rows)
+        conn.execute("CREATE INDEX idx_licenses_license ON licenses (n_license)")
+        conn.execute("CREATE INDEX idx_licenses_name_dob ON licenses (n_name, n_dob)")
+        conn.execute("CREATE TABLE blocks (key TEXT NOT NULL, id INTEGER NOT NULL)")
+        conn.executemany(
+            "INSERT INTO blocks VALUES (?, ?)",
+            (
+                (key, idx)
+                for idx, record in enumerate(records)
+                for key in blocking_keys(record.get("full_name"), normalize_record(record))
+            ),
+        )
+        conn.execute("CREATE INDEX idx_blocks_key ON blocks (key, id)")
+        conn.execute(f"PRAGMA user_version={LICENSE_DB_SCHEMA_VERSION}")
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    return len(records)
+
+
+class SqliteNursingLicenseRegistry:
+    """
+    Nursing license registry backed by a compiled SQLite file.
+
+    The file is opened read-only and memory-mapped, so opening it costs almost
+    nothing and every worker process shares the same page-cache pages instead of
+    holding its own copy of the records.
+    """
+
+    def __init__(self, db_path=LICENSE_DB_COMPILED_PATH, mmap_size=LICENSE_DB_MMAP_SIZE):
+        self.db_path = Path(db_path)
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._len = None
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self):
+        if self._len is None:
+            self._len = self._conn().execute("SELECT COUNT(*) FROM licenses").fetchone()[0]
+        return self._len
+
+    def record(self, idx):
+        row = self._conn().execute(
+            f"SELECT {', '.join(_RECORD_KEYS)}, extra FROM licenses WHERE id = ?", (idx,)
+        ).fetchone()
+        record = dict(zip(_RECORD_KEYS, row[:-1]))
+        if row[-1]:
+            record.update(json.loads(row[-1]))
+        return record
+
+    def normalized_record(self, idx):
+        return self._conn().execute(
+            f"SELECT {', '.join(_NORMALIZED_COLUMNS)} FROM licenses WHERE id = ?", (idx,)
+        ).fetchone()
+
+    def exact_candidates(self, norm):
+        """Return ids of records that could match the normalized fields exactly, in registry order."""
+        if norm[2]:
+            rows = self._conn().execute("SELECT id FROM licenses WHERE n_license = ? ORDER BY id", (norm[2],))
+        else:
+            rows = self._conn().execute(
+                "SELECT id FROM licenses WHERE n_name = ? AND n_dob = ? ORDER BY id", (norm[0], norm[1])
+            )
+        return [row[0] for row in rows]
+
+    def normalized_matrix(self, ids):
+        """Normalized fields of the given records as an (len(ids), 6) string array."""
+        rows = [self.normalized_record(idx) for idx in ids]
+        return np.array(rows, dtype=np.str_).reshape(len(rows), len(LICENSE_FIELDS))
+
+    def match_candidates(self, keys, limit=MAX_MATCH_CANDIDATES):
+        """Return up to limit record ids sharing the most blocking keys, in registry order on ties."""
+        keys = list(keys)
+        if not keys:
+            return []
+        rows = self._conn().execute(
+            f"SELECT id FROM blocks WHERE key IN ({', '.join('?' * len(keys))}) "
+            "GROUP BY id ORDER BY COUNT(*) DESC, id LIMIT ?",
+            keys + [limit],
+        )
+        return [row[0] for row in rows]
+
+    def schema_version(self):
+        return self._conn().execute("PRAGMA user_version").fetchone()[0]
+
+
+def load_nursing_license_registry():
+    """
+    Load the nursing license registry.
+
+    Uses the compiled SQLite database when it is at least as new as the JSON source,
+    otherwise parses the JSON and builds an in-memory registry.
+    """
+    compiled = LICENSE_DB_COMPILED_PATH
+    if compiled.exists() and compiled.stat().st_mtime >= LICENSE_DB_JSON_PATH.stat().st_mtime:
+        registry = SqliteNursingLicenseRegistry(compiled)
+        if registry.schema_version() == LICENSE_DB_SCHEMA_VERSION:
+            return registry
+    return NursingLicenseRegistry(load_nursing_license_db())
+
+def as_registry(db_data):
+    """Return db_data as a registry, indexing it first if it is a plain list of records."""
+    if hasattr(db_data, "exact_candidates"):
+        return db_data
+    return NursingLicenseRegistry(db_data)
+
+def _field_mismatches(extracted_info, extracted_norm, record, record_norm):
+    mismatches = {}
+    for (field, record_key, _), extracted_val, record_val in zip(LICENSE_FIELDS, extracted_norm, record_norm):
+        if extracted_val != record_val:
+            mismatches[field] = (extracted_info.get(field), record.get(record_key))
+    return mismatches
+
 def verify_nursing_license(extracted_info, db_data):
     """
     Verify extracted nursing license info against the database.
@@ -37,61 +352,99 @@ def verify_nursing_license(extracted_info, db_data):
 
     Args:
         extracted_info (dict): Extracted fields from the document.
-        db_data (list): List of nursing license records.
+        db_data (NursingLicenseRegistry or list): Indexed registry, or a plain list of
+            nursing license records (indexed on the fly).
 
     Returns:
         bool: True if a matching record is found (all fields match), else False.
         dict: Matched record if found or closest record if mismatches found.
         dict: Mismatches with keys as field names and values as tuple (extracted_value, db_value).
     """
+    registry = as_registry(db_data)
+    extracted_norm = normalize_extracted_info(extracted_info)
+
+    # Any perfect match shares the indexed key, so only those records need checking
+    for idx in registry.exact_candidates(extracted_norm):
+        if registry.normalized_record(idx) == extracted_norm:
+            return True, registry.record(idx), {}
 
-    # Normalize extracted info fields
-    extracted_full_name = normalize_str(extracted_info.get("name") or extracted_info.get("full_name"))
-    extracted_dob = normalize_date(extracted_info.get("date_of_birth", ""))
-    extracted_license_num = normalize_str(extracted_info.get("license_number", ""))
-    extracted_gender = normalize_str(extracted_info.get("gender", ""))
-    extracted_valid_until = normalize_date(extracted_info.get("valid_until", ""))
-    extracted_field_of_practice = normalize_str(extracted_info.get("to_practice_as") or extracted_info.get("field_of_practice"))
+    return _closest_record(registry, extracted_info, extracted_norm)
 
+def _closest_record(registry, extracted_info, extracted_norm):
+    """
+    Find the closest record among those sharing a blocking key with the document,
+    preferring fewest mismatched fields and then the most similar values (tolerates typos).
+    """
     best_match = None
-    best_mismatches = None
-    fewest_mismatches_count = float('inf')
-
-    for record in db_data:
-        record_full_name = normalize_str(record.get("full_name"))
-        record_dob = normalize_date(record.get("date_of_birth", ""))
-        record_license_num = normalize_str(record.get("license_number", ""))
-        record_gender = normalize_str(record.get("gender", ""))
-        record_valid_until = normalize_date(record.get("valid_until", ""))
-        record_field_of_practice = normalize_str(record.get("field_of_practice"))
-
-        mismatches = {}
-
-        if record_full_name != extracted_full_name:
-            mismatches["name"] = (extracted_info.get("name"), record.get("full_name"))
-        if record_dob != extracted_dob:
-            mismatches["date_of_birth"] = (extracted_info.get("date_of_birth"), record.get("date_of_birth"))
-        if record_license_num != extracted_license_num:
-            mismatches["license_number"] = (extracted_info.get("license_number"), record.get("license_number"))
-        if record_gender != extracted_gender:
-            mismatches["gender"] = (extracted_info.get("gender"), record.get("gender"))
-        if record_valid_until != extracted_valid_until:
-            mismatches["valid_until"] = (extracted_info.get("valid_until"), record.get("valid_until"))
-        if record_field_of_practice != extracted_field_of_practice:
-            mismatches["field_of_practice"] = (extracted_info.get("field_of_practice"), record.get("field_of_practice"))
-
-        if not mismatches:
-            # Perfect match found
-            return True, record, {}
-
-        # Track record with fewest mismatches
-        if len(mismatches) < fewest_mismatches_count:
-            fewest_mismatches_count = len(mismatches)
-            best_match = record
-            best_mismatches = mismatches
-
-    if best_match:
-        return False, best_match, best_mismatches
+    best_score = None
+
+    keys = blocking_keys(extracted_info.get("name") or extracted_info.get("full_name"), extracted_norm)
+    candidates = registry.match_candidates(keys)
+    if candidates:
+        # Vectorized mismatch counts; similarity is only computed for the fewest-mismatch candidates
+        mismatch_counts = (registry.normalized_matrix(candidates) != np.array(extracted_norm, dtype=np.str_)).sum(axis=1)
+        fewest = mismatch_counts.min()
+        for pos in np.flatnonzero(mismatch_counts == fewest):
+            idx = candidates[pos]
+            record_norm = registry.normalized_record(idx)
+            similarity = sum(_similarity(a, b) for a, b in zip(extracted_norm, record_norm))
+            if best_score is None or similarity > best_score:
+                best_score = similarity
+                best_match = idx
+
+    if best_match is not None:
+        record = registry.record(best_match)
+        best_mismatches = _field_mismatches(extracted_info, extracted_norm, record, registry.normalized_record(best_match))
+        return False, record, best_mismatches
 
     # No records found at all (empty db or no similar records)
     return False, None, {"record": ("No record found matching extracted data", None)}
+
+
+def verify_nursing_licenses_batch(extracted_infos, registry):
+    """
+    Verify many extracted nursing licenses against the database in one pass.
+
+    Documents are normalized in bulk and joined to their indexed candidate records,
+    and all (document, candidate) pairs are compared at once with a vectorized
+    equality mask over the column-oriented normalized fields. Documents without an
+    exact match fall back to the closest-record search of verify_nursing_license.
+
+    Args:
+        extracted_infos (list): Extracted fields of each document.
+        registry (NursingLicenseRegistry or list): Indexed registry, or a plain list of records.
+
+    Returns:
+        list: One (is_valid, record, mismatches) tuple per document, in input order,
+              identical to what verify_nursing_license returns for that document.
+    """
+    registry = as_registry(registry)
+    extracted_infos = list(extracted_infos)
+    extracted_norms = [normalize_extracted_info(info) for info in extracted_infos]
+    results = [None] * len(extracted_infos)
+
+    pair_docs = []
+    pair_ids = []
+    for doc_idx, norm in enumerate(extracted_norms):
+        for idx in registry.exact_candidates(norm):
+            pair_docs.append(doc_idx)
+            pair_ids.append(idx)
+
+    if pair_ids:
+        doc_matrix = np.array(extracted_norms, dtype=np.str_).reshape(len(extracted_norms), len(LICENSE_FIELDS))
+        exact = (doc_matrix[np.asarray(pair_docs, dtype=np.intp)] == registry.normalized_matrix(pair_ids)).all(axis=1)
+        # Pairs are in document then registry order, so the first hit per document wins
+        for pair in np.flatnonzero(exact):
+            doc_idx = pair_docs[pair]
+            if results[doc_idx] is None:
+                results[doc_idx] = (True, registry.record(pair_ids[pair]), {})
+
+    for doc_idx, result in enumerate(results):
+        if result is None:
+            results[doc_idx] = _closest_record(registry, extracted_infos[doc_idx], extracted_norms[doc_idx])
+    return results
+
+if __name__ == "__main__":
+    # Build step: python -m app.db_utils
+    count = compile_nursing_license_db()
+    print(f"Compiled {count} nursing license record(s) into {LICENSE_DB_COMPILED_PATH}")
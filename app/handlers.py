@@ -1,21 +1,247 @@
+import hashlib
 import os
+import sqlite3
+import tempfile
+import threading
+import time
 from pathlib import Path
 
+from app.checklist_state_manager import DEFAULT_CANDIDATE_ID
+from app.metrics import span
+from app.sqlite_utils import thread_transaction
+
 # Define upload path
 UPLOAD_FOLDER = Path("data/uploads")
 UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
 
-def save_uploaded_files(uploaded_files):
-    saved_paths = []
+# Uploads are stored once per content hash under blobs/<ab>/<cd>/<sha256>, indexed in SQLite
+UPLOAD_BLOB_DIR = UPLOAD_FOLDER / "blobs"
+UPLOAD_INDEX_PATH = UPLOAD_FOLDER / "uploads.db"
+
+# Size limits for a single file and for all files uploaded in one session
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_BYTES", str(20 * 1024 * 1024)))
+MAX_SESSION_UPLOAD_BYTES = int(os.getenv("MAX_SESSION_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+
+# Retention: blobs unused for UPLOAD_MAX_AGE_SECONDS are evicted, then least recently used ones
+# until the store fits UPLOAD_STORE_MAX_BYTES. Blobs used in the last UPLOAD_MIN_AGE_SECONDS are kept.
+UPLOAD_STORE_MAX_BYTES = int(os.getenv("UPLOAD_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+UPLOAD_MAX_AGE_SECONDS = float(os.getenv("UPLOAD_MAX_AGE_SECONDS", str(30 * 24 * 3600)))
+UPLOAD_MIN_AGE_SECONDS = float(os.getenv("UPLOAD_MIN_AGE_SECONDS", "3600"))
+UPLOAD_SWEEP_SECONDS = float(os.getenv("UPLOAD_SWEEP_SECONDS", "600"))
+
+# Bytes copied per write when saving an upload
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
+
+class UploadLimitError(ValueError):
+    """Raised when uploaded files exceed the per-file or per-session size limit."""
+
+
+def check_upload_limits(uploaded_files):
+    """Raise UploadLimitError if any file, or all files together, exceed the configured limits."""
+    total = 0
     for file in uploaded_files:
-        # Define path to save the file
-        save_path = UPLOAD_FOLDER / file.name
-
-        # Save the file to disk
-        with open(save_path, "wb") as f:
-            f.write(file.getbuffer())
-        
-        saved_paths.append(str(save_path))
+        if file.size > MAX_UPLOAD_FILE_BYTES:
+            raise UploadLimitError(
+                f"'{file.name}' is {file.size / 1024 / 1024:.1f} MB; "
+                f"the limit is {MAX_UPLOAD_FILE_BYTES / 1024 / 1024:.0f} MB per file."
+            )
+        total += file.size
+    if total > MAX_SESSION_UPLOAD_BYTES:
+        raise UploadLimitError(
+            f"Uploads total {total / 1024 / 1024:.1f} MB; "
+            f"the limit is {MAX_SESSION_UPLOAD_BYTES / 1024 / 1024:.0f} MB per session."
+        )
+
+
+class UploadStore:
+    """
+    Content-addressed upload storage with per-candidate manifests.
+
+    Each distinct file is stored once, at blobs/<ab>/<cd>/<sha256>, so directories
+    stay small and identical scans share one blob. A SQLite index maps each
+    candidate's file names to blobs and counts the references to every blob.
+    sweep() deletes unreferenced blobs and evicts blobs by age and total size
+    (dropping the manifest entries that point to them). Saves and sweeps each run
+    in one IMMEDIATE transaction, so a blob is never deleted while being re-added.
+    """
+
+    def __init__(self, blob_dir=UPLOAD_BLOB_DIR, index_path=UPLOAD_INDEX_PATH, max_bytes=UPLOAD_STORE_MAX_BYTES,
+                 max_age_seconds=UPLOAD_MAX_AGE_SECONDS, min_age_seconds=UPLOAD_MIN_AGE_SECONDS):
+        self.blob_dir = Path(blob_dir)
+        self.tmp_dir = self.blob_dir / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = Path(index_path)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.min_age_seconds = min_age_seconds
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, refcount INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_last_used ON blobs (last_used_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS manifest ("
+                "candidate_id TEXT NOT NULL, name TEXT NOT NULL, sha256 TEXT NOT NULL, uploaded_at REAL NOT NULL, "
+                "PRIMARY KEY (candidate_id, name)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_manifest_sha256 ON manifest (sha256)")
+
+    def _conn(self):
+        return thread_transaction(self._local, self.index_path)
+
+    def blob_path(self, sha256):
+        return self.blob_dir / sha256[:2] / sha256[2:4] / sha256
+
+    def save(self, file, candidate_id=DEFAULT_CANDIDATE_ID):
+        """
+        Store an uploaded file for candidate_id and return its blob path.
+
+        The file is copied in chunks to a temporary file while being hashed, then moved
+        into place unless an identical blob already exists.
+        """
+        digest = hashlib.sha256()
+        file.seek(0)
+        with tempfile.NamedTemporaryFile(dir=self.tmp_dir, delete=False) as tmp:
+            for chunk in iter(lambda: file.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                tmp.write(chunk)
+            size = tmp.tell()
+        sha256 = digest.hexdigest()
+        path = self.blob_path(sha256)
+
+        now = time.time()
+        try:
+            with self._conn() as conn:
+                if path.exists():
+                    os.remove(tmp.name)
+                else:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp.name, path)
+                previous = conn.execute(
+                    "SELECT sha256 FROM manifest WHERE candidate_id = ? AND name = ?", (candidate_id, file.name)
+                ).fetchone()
+                if previous is None or previous[0] != sha256:
+                    conn.execute(
+                        "INSERT INTO blobs VALUES (?, ?, 1, ?, ?) ON CONFLICT (sha256) "
+                        "DO UPDATE SET refcount = refcount + 1, last_used_at = excluded.last_used_at",
+                        (sha256, size, now, now),
+                    )
+                    if previous is not None:
+                        conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE sha256 = ?", (previous[0],))
+                else:
+                    conn.execute("UPDATE blobs SET last_used_at = ? WHERE sha256 = ?", (now, sha256))
+                conn.execute(
+                    "INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?)", (candidate_id, file.name, sha256, now)
+                )
+        finally:
+            if os.path.exists(tmp.name):
+                os.remove(tmp.name)
+        return str(path)
+
+    def manifest(self, candidate_id):
+        """The candidate's uploads as {name: blob path}."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT name, sha256 FROM manifest WHERE candidate_id = ? ORDER BY uploaded_at", (candidate_id,)
+            ).fetchall()
+        return {name: str(self.blob_path(sha256)) for name, sha256 in rows}
+
+    def stats(self):
+        """Blob count, total stored bytes and manifest entry count."""
+        with self._conn() as conn:
+            blobs, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            entries = conn.execute("SELECT COUNT(*) FROM manifest").fetchone()[0]
+        return {"blobs": blobs, "bytes": total, "manifest_entries": entries}
+
+    def sweep(self, now=None):
+        """
+        Evict blobs, oldest use first: unreferenced ones, those unused for max_age_seconds,
+        then as many as needed to fit max_bytes. Blobs used within min_age_seconds are kept.
+
+        Returns:
+            dict: Number of blobs and bytes evicted.
+        """
+        now = time.time() if now is None else now
+        evicted, freed = 0, 0
+        with self._conn() as conn:
+            candidates = conn.execute(
+                "SELECT sha256, size, refcount, last_used_at FROM blobs WHERE last_used_at < ? ORDER BY last_used_at",
+                (now - self.min_age_seconds,),
+            ).fetchall()
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            victims = []
+            for sha256, size, refcount, last_used_at in candidates:
+                if refcount > 0 and last_used_at >= now - self.max_age_seconds and total <= self.max_bytes:
+                    continue
+                victims.append(sha256)
+                total -= size
+                evicted += 1
+                freed += size
+            for sha256 in victims:
+                conn.execute("DELETE FROM manifest WHERE sha256 = ?", (sha256,))
+                conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+                try:
+                    os.remove(self.blob_path(sha256))
+                except FileNotFoundError:
+                    pass
+        self._remove_stale_tmp(now)
+        return {"evicted": evicted, "bytes_freed": freed}
+
+    def _remove_stale_tmp(self, now):
+        """Delete temporary files left behind by saves that were interrupted."""
+        for tmp in self.tmp_dir.iterdir():
+            try:
+                if tmp.stat().st_mtime < now - self.min_age_seconds:
+                    tmp.unlink()
+            except FileNotFoundError:
+                pass
+
+    def start_sweeper(self, interval=UPLOAD_SWEEP_SECONDS):
+        """Run sweep() every interval seconds on a daemon thread."""
+        def sweep_loop():
+            while True:
+                try:
+                    self.sweep()
+                except (OSError, sqlite3.Error):
+                    pass
+                time.sleep(interval)
+
+        threading.Thread(target=sweep_loop, name="upload-sweeper", daemon=True).start()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_upload_store():
+    """Return the process-wide UploadStore, starting its background sweeper on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = UploadStore()
+            _store.start_sweeper()
+        return _store
+
+
+def save_uploaded_files(uploaded_files, candidate_id=DEFAULT_CANDIDATE_ID):
+    """
+    Store uploaded files in the content-addressed upload store under candidate_id.
+
+    Returns:
+        list: Blob paths, in the order of uploaded_files. Identical files share a path.
+    """
+    check_upload_limits(uploaded_files)
+
+    store = get_upload_store()
+    saved_paths = []
+
+    with span("save_uploads") as save_span:
+        for file in uploaded_files:
+            saved_paths.append(store.save(file, candidate_id))
+            save_span.add_bytes(received=file.size)
 
     return saved_paths
@@ -1,34 +1,197 @@
+import atexit
 import csv
+import logging
 import os
-from datetime import datetime
+import sqlite3
+import threading
+import time
 
+# Legacy CSV log, imported into the database the first time it is opened
 ISSUE_LOG_PATH = os.path.join(os.path.dirname(__file__), "..", "data_logs", "issue_log.csv")
+ISSUE_DB_PATH = os.getenv("ISSUE_DB_PATH", os.path.join(os.path.dirname(__file__), "..", "data_logs", "issue_log.db"))
 
-def save_escalation(employee_name: str, issue_description: str, date: str):
+# Escalations are buffered and written in batches of this size, or after this many seconds
+ESCALATION_BATCH_SIZE = int(os.getenv("ESCALATION_BATCH_SIZE", "20"))
+ESCALATION_FLUSH_SECONDS = float(os.getenv("ESCALATION_FLUSH_SECONDS", "2"))
+
+ESCALATION_FIELDS = ["date", "employee_name", "issue_description", "status"]
+
+logger = logging.getLogger(__name__)
+
+
+class EscalationStore:
     """
-    Append a new HR issue to the issue_log.csv file with timestamp, employee name, issue, and status.
-    Creates the file with headers if it doesn't exist.
+    HR escalation log in SQLite.
+
+    Appends are buffered and written in one transaction per batch. SQLite's locking
+    keeps concurrent writers from several Streamlit processes from interleaving.
+    Status, employee name and date are indexed, so open escalations can be paged
+    through without scanning the whole log.
     """
-    print("📥 save_escalation() called with:")
-    print(f"👤 Employee Name: {employee_name}")
-    print(f"📝 Issue Description: {issue_description}")
-    print(f"📅 Date: {date}")
 
-    os.makedirs(os.path.dirname(ISSUE_LOG_PATH), exist_ok=True)
+    def __init__(self, db_path=ISSUE_DB_PATH, batch_size=ESCALATION_BATCH_SIZE,
+                 flush_seconds=ESCALATION_FLUSH_SECONDS, legacy_csv_path=ISSUE_LOG_PATH):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._timer = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS escalations ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, employee_name TEXT, "
+            "issue_description TEXT, status TEXT NOT NULL DEFAULT 'Open', created_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_escalations_status ON escalations (status, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_escalations_employee ON escalations (employee_name, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_escalations_date ON escalations (date, id)")
+        self._db.commit()
+        self._import_legacy_csv(legacy_csv_path)
+
+    def _import_legacy_csv(self, csv_path):
+        if not csv_path or not os.path.isfile(csv_path):
+            return
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM escalations LIMIT 1").fetchone():
+                return
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                rows = [
+                    (row.get("date"), row.get("employee_name"), row.get("issue_description"),
+                     row.get("status") or "Open", time.time())
+                    for row in csv.DictReader(f)
+                ]
+            self._insert(rows)
+
+    def _insert(self, rows):
+        """Write rows in one transaction. Caller holds the lock."""
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO escalations (date, employee_name, issue_description, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def add(self, employee_name, issue_description, date, status="Open"):
+        """Buffer an escalation; it is written once the batch fills or flush_seconds pass."""
+        with self._lock:
+            self._buffer.append((date, employee_name, issue_description, status, time.time()))
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+            elif self._timer is None:
+                self._schedule_flush_locked()
+
+    def _schedule_flush_locked(self):
+        self._timer = threading.Timer(self.flush_seconds, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self):
+        """Write any buffered escalations now."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        """Write the buffer. If the write fails the rows stay buffered and another flush is scheduled."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        try:
+            self._insert(self._buffer)
+        except sqlite3.Error:
+            logger.warning("Could not write %d escalation(s); retrying in %ss",
+                           len(self._buffer), self.flush_seconds, exc_info=True)
+            self._schedule_flush_locked()
+            return
+        self._buffer = []
 
-    file_exists = os.path.isfile(ISSUE_LOG_PATH)
-    with open(ISSUE_LOG_PATH, mode='a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=["date", "employee_name", "issue_description", "status"])
+    def query(self, status="Open", employee_name=None, date_from=None, date_to=None, after_id=0, limit=50):
+        """
+        Page through escalations matching the filters, oldest first.
 
-        if not file_exists:
-            print("📄 issue_log.csv does not exist. Creating with headers...")
-            writer.writeheader()
+        Args:
+            status (str): Only escalations with this status; None for any.
+            employee_name (str): Only escalations for this employee.
+            date_from, date_to (str): Inclusive range on the escalation date (yyyy-mm-dd).
+            after_id (int): Return escalations after this id; pass the last id of the previous page.
+            limit (int): Page size.
+
+        Returns:
+            list: Escalations as dicts with 'id' plus the CSV log fields.
+        """
+        self.flush()
+        clauses, params = ["id > ?"], [after_id]
+        for clause, value in (
+            ("status = ?", status), ("employee_name = ?", employee_name),
+            ("date >= ?", date_from), ("date <= ?", date_to),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, date, employee_name, issue_description, status FROM escalations "
+                f"WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?",
+                params + [limit],
+            ).fetchall()
+        return [dict(zip(["id"] + ESCALATION_FIELDS, row)) for row in rows]
+
+    def count(self, status="Open"):
+        self.flush()
+        with self._lock:
+            if status is None:
+                return self._db.execute("SELECT COUNT(*) FROM escalations").fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM escalations WHERE status = ?", (status,)).fetchone()[0]
+
+    def set_status(self, escalation_id, status):
+        """Change an escalation's status, e.g. to 'Closed'."""
+        self.flush()
+        with self._lock, self._db:
+            self._db.execute("UPDATE escalations SET status = ? WHERE id = ?", (status, escalation_id))
+
+    def export_csv(self, csv_path):
+        """Write every escalation to a CSV file with the legacy issue_log.csv columns."""
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT date, employee_name, issue_description, status FROM escalations ORDER BY id"
+            ).fetchall()
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(ESCALATION_FIELDS)
+            writer.writerows(rows)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_escalation_store():
+    """Return the process-wide EscalationStore, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EscalationStore()
+            atexit.register(_store.flush)
+        return _store
+
+
+def save_escalation(employee_name: str, issue_description: str, date: str):
+    """
+    Record a new HR escalation with status "Open".
+    Escalations are buffered and written to the escalation database in batches.
+    """
+    get_escalation_store().add(employee_name, issue_description, date)
 
-        writer.writerow({
-            "date": date,
-            "employee_name": employee_name,
-            "issue_description": issue_description,
-            "status": "Open"
-        })
 
-    print("✅ Escalation successfully written to issue_log.csv")
+def query_escalations(status="Open", employee_name=None, date_from=None, date_to=None, after_id=0, limit=50):
+    """Page through escalations; see EscalationStore.query."""
+    return get_escalation_store().query(
+        status=status, employee_name=employee_name, date_from=date_from, date_to=date_to,
+        after_id=after_id, limit=limit,
+    )
@@ -0,0 +1,245 @@
+import base64
+import io
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.metrics import get_metrics_registry
+
+# (connect, read) timeouts in seconds for each upstream service
+ENDPOINT_TIMEOUTS = {
+    "azure": (float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")), float(os.getenv("AZURE_READ_TIMEOUT", "90"))),
+    "groq": (float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")), float(os.getenv("GROQ_READ_TIMEOUT", "30"))),
+}
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+
+# Consecutive failures that open an endpoint's circuit, and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# Raw bytes read from the source per base64 chunk of a streamed body (a multiple of 3)
+BASE64_CHUNK_SIZE = 48 * 1024
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while an endpoint's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After failure_threshold failed requests in a row (each request counted once,
+    however many times it was retried) the circuit opens and requests are
+    refused for reset_seconds. Then a single trial request is let through: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class Base64JSONBody:
+    """
+    File-like JSON request body that base64-encodes a binary source while it is sent.
+
+    The payload is serialized with placeholder standing in for the base64 data, and
+    the source is read and encoded chunk by chunk only as the body is read, so the
+    full base64 string and JSON document never exist in memory. The length is known
+    up front, so requests sends a Content-Length header instead of chunking.
+    """
+
+    def __init__(self, payload, placeholder, source, source_size, chunk_size=BASE64_CHUNK_SIZE):
+        prefix, suffix = json.dumps(payload).split(placeholder)
+        self._prefix = prefix.encode("utf-8")
+        self._suffix = suffix.encode("utf-8")
+        self._source = source
+        self._source_start = source.tell()
+        self._chunk_size = max(3, chunk_size - chunk_size % 3)
+        self._length = len(self._prefix) + 4 * ((source_size + 2) // 3) + len(self._suffix)
+        # Seconds spent base64-encoding, summed over every (re)send of the body
+        self.encode_seconds = 0.0
+        self.seek(0)
+
+    def __len__(self):
+        return self._length
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Rewind to the start (the only supported seek), e.g. before a retry."""
+        if (offset, whence) not in ((0, io.SEEK_SET), (0, io.SEEK_CUR)):
+            raise io.UnsupportedOperation("Base64JSONBody can only be rewound to the start.")
+        if whence == io.SEEK_SET:
+            self._source.seek(self._source_start)
+            self._chunks = self._iter_chunks()
+            self._buffer = b""
+            self._position = 0
+        return self._position
+
+    def _iter_chunks(self):
+        yield self._prefix
+        for chunk in iter(lambda: self._source.read(self._chunk_size), b""):
+            start = time.perf_counter()
+            encoded = base64.b64encode(chunk)
+            self.encode_seconds += time.perf_counter() - start
+            yield encoded
+        yield self._suffix
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self._position += len(data)
+        return data
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the Azure OpenAI and Groq APIs.
+
+    Reuses pooled keep-alive connections, applies per-endpoint timeouts, retries
+    429/5xx responses and connection errors with jittered exponential backoff,
+    and trips a per-endpoint circuit breaker when an upstream keeps failing.
+    """
+
+    def __init__(self, max_retries=HTTP_MAX_RETRIES, backoff_base=HTTP_BACKOFF_BASE,
+                 backoff_max=HTTP_BACKOFF_MAX, pool_size=HTTP_POOL_SIZE):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint):
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker()
+            return self._breakers[endpoint]
+
+    def _backoff(self, attempt, response=None):
+        """Seconds to wait before retry number attempt (0-based), honouring Retry-After when given."""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter: uniform over [0, capped exponential]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, endpoint, url, **kwargs):
+        """
+        POST to url on behalf of endpoint ("azure", "groq", ...).
+
+        Returns the final response, which may still be a 429/5xx once retries are
+        exhausted. Raises CircuitOpenError while the endpoint's circuit is open, and
+        requests.RequestException when the request could not be completed.
+
+        The circuit breaker sees one outcome per call, not per attempt: success if a
+        non-retryable response came back, failure otherwise (including any exception).
+        """
+        kwargs.setdefault("timeout", ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT))
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for '{endpoint}'; not sending request.")
+
+        succeeded = False
+        try:
+            attempt = 0
+            while True:
+                # File-like bodies were consumed by the previous attempt
+                body = kwargs.get("data")
+                if attempt and hasattr(body, "seek"):
+                    body.seek(0)
+
+                try:
+                    response = self.session.post(url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt >= self.max_retries:
+                        raise
+                    get_metrics_registry().inc("http_retries_total", endpoint=endpoint, reason="connection")
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+
+                if response.status_code not in RETRY_STATUS_CODES:
+                    succeeded = True
+                    return response
+
+                if attempt >= self.max_retries:
+                    return response
+                get_metrics_registry().inc("http_retries_total", endpoint=endpoint, reason=str(response.status_code))
+                delay = self._backoff(attempt, response)
+                response.close()
+                time.sleep(delay)
+                attempt += 1
+        finally:
+            # Always resolve the outcome, so a half-open trial can never stay in flight
+            if succeeded:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide HttpClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,411 @@
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from app.db_utils import load_nursing_license_registry
+from app.metrics import collect_spans
+from app.pipeline import VALIDATION_MAX_WORKERS, process_document
+from app.sqlite_utils import thread_transaction
+
+# SQLite database holding validation jobs; shared by the app and standalone workers
+JOB_QUEUE_DB_PATH = Path(os.getenv("JOB_QUEUE_DB_PATH", "data/jobs.db"))
+
+# A claimed job is handed to another worker if its lease is not renewed in time
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_BASE = float(os.getenv("JOB_RETRY_BACKOFF_BASE", "2"))
+JOB_RETRY_BACKOFF_MAX = float(os.getenv("JOB_RETRY_BACKOFF_MAX", "60"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+
+# Finished jobs are reused for identical submissions until they are this old
+JOB_RESULT_MAX_AGE_SECONDS = float(os.getenv("JOB_RESULT_MAX_AGE_SECONDS", str(24 * 3600)))
+
+# Worker threads started inside the Streamlit process; set to 0 when running standalone workers
+JOB_WORKERS_IN_PROCESS = int(os.getenv("JOB_WORKERS_IN_PROCESS", str(VALIDATION_MAX_WORKERS)))
+
+VALIDATION_JOB = "validate_document"
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED_STATUSES = (DONE, FAILED)
+
+
+class JobQueue:
+    """
+    Persistent job queue in SQLite (WAL mode).
+
+    Jobs are deduplicated by key: submitting a key that is queued, running or
+    recently done returns the existing job. Workers claim jobs under a lease that
+    they renew while working; a job whose lease lapses (e.g. its worker died) is
+    claimed again. Failed attempts are retried with jittered exponential backoff
+    up to max_attempts. Batches group the jobs of one submission so a UI can find
+    them again after a rerun or reload.
+    """
+
+    def __init__(self, db_path=JOB_QUEUE_DB_PATH, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, dedup_key TEXT, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, "
+                "available_at REAL NOT NULL, lease_owner TEXT, lease_expires_at REAL, "
+                "result TEXT, error TEXT, created_at REAL NOT NULL, finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, available_at, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (kind, dedup_key, id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_batches ("
+                "batch_id TEXT PRIMARY KEY, candidate_id TEXT, created_at REAL NOT NULL, applied_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_batches_candidate ON job_batches (candidate_id, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_batch_items ("
+                "batch_id TEXT NOT NULL, position INTEGER NOT NULL, job_id INTEGER NOT NULL, "
+                "PRIMARY KEY (batch_id, position)) WITHOUT ROWID"
+            )
+
+    def _conn(self):
+        return thread_transaction(self._local, self.db_path, sqlite3.Row)
+
+    def enqueue(self, kind, payload, dedup_key=None, max_attempts=None):
+        """
+        Add a job, or return the id of an existing job with the same kind and dedup_key.
+
+        A finished job is reused only if it succeeded within JOB_RESULT_MAX_AGE_SECONDS;
+        otherwise a new job is queued.
+
+        Returns:
+            int: The job id.
+        """
+        now = time.time()
+        with self._conn() as conn:
+            if dedup_key is not None:
+                existing = conn.execute(
+                    "SELECT id, status, finished_at FROM jobs WHERE kind = ? AND dedup_key = ? ORDER BY id DESC LIMIT 1",
+                    (kind, dedup_key),
+                ).fetchone()
+                if existing and (
+                    existing["status"] in (QUEUED, RUNNING)
+                    or (existing["status"] == DONE and now - existing["finished_at"] < JOB_RESULT_MAX_AGE_SECONDS)
+                ):
+                    return existing["id"]
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, dedup_key, payload, status, max_attempts, available_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, dedup_key, json.dumps(payload), QUEUED, max_attempts or self.max_attempts, now, now),
+            )
+            return cursor.lastrowid
+
+    def claim(self, owner, kinds=None):
+        """
+        Lease the oldest runnable job to owner.
+
+        Runnable jobs are queued jobs whose backoff has elapsed and running jobs whose
+        lease has expired.
+
+        Returns:
+            dict | None: The claimed job (see get), or None if there is nothing to do.
+        """
+        now = time.time()
+        kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})" if kinds else ""
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE ((status = ? AND available_at <= ?) OR (status = ? AND lease_expires_at < ?))"
+                + kind_filter + " ORDER BY id LIMIT 1",
+                (QUEUED, now, RUNNING, now, *(kinds or ())),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_expires_at = ? WHERE id = ?",
+                (RUNNING, owner, now + self.lease_seconds, row["id"]),
+            )
+            return self._get(conn, row["id"])
+
+    def renew(self, job_ids, owner):
+        """Extend owner's leases on job_ids; jobs that were re-leased to someone else are left alone."""
+        if not job_ids:
+            return
+        with self._conn() as conn:
+            conn.executemany(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND lease_owner = ? AND status = ?",
+                [(time.time() + self.lease_seconds, job_id, owner, RUNNING) for job_id in job_ids],
+            )
+
+    def complete(self, job_id, owner, result):
+        """Mark owner's job done with result. Returns False if owner no longer holds the lease."""
+        with self._conn() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, finished_at = ?, lease_owner = NULL, "
+                "lease_expires_at = NULL WHERE id = ? AND lease_owner = ? AND status = ?",
+                (DONE, json.dumps(result), time.time(), job_id, owner, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id, owner, error, result=None):
+        """
+        Record a failed attempt of owner's job.
+
+        The job is queued again after a backoff, or marked failed once it has used
+        all its attempts; result (if given) is kept so the last report can be shown.
+
+        Returns:
+            bool: False if owner no longer holds the lease.
+        """
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ? AND status = ?",
+                (job_id, owner, RUNNING),
+            ).fetchone()
+            if row is None:
+                return False
+            if row["attempts"] >= row["max_attempts"]:
+                status, available_at, finished_at = FAILED, now, now
+            else:
+                delay = min(JOB_RETRY_BACKOFF_MAX, JOB_RETRY_BACKOFF_BASE * (2 ** (row["attempts"] - 1)))
+                status, available_at, finished_at = QUEUED, now + random.uniform(delay / 2, delay), None
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, finished_at = ?, error = ?, result = ?, "
+                "lease_owner = NULL, lease_expires_at = NULL WHERE id = ?",
+                (status, available_at, finished_at, str(error),
+                 json.dumps(result) if result is not None else None, job_id),
+            )
+            return True
+
+    def get(self, job_id):
+        """Return a job as a dict (payload and result decoded), or None."""
+        with self._conn() as conn:
+            return self._get(conn, job_id)
+
+    def _get(self, conn, job_id):
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_dict(row) if row else None
+
+    def create_batch(self, candidate_id, job_ids):
+        """Group job_ids, in order, as one submission for candidate_id. Returns the batch id."""
+        batch_id = uuid.uuid4().hex
+        with self._conn() as conn:
+            conn.execute("INSERT INTO job_batches VALUES (?, ?, ?, NULL)", (batch_id, candidate_id, time.time()))
+            conn.executemany(
+                "INSERT INTO job_batch_items VALUES (?, ?, ?)",
+                [(batch_id, position, job_id) for position, job_id in enumerate(job_ids)],
+            )
+        return batch_id
+
+    def batch_jobs(self, batch_id):
+        """The batch's jobs in submission order."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT jobs.* FROM job_batch_items JOIN jobs ON jobs.id = job_batch_items.job_id "
+                "WHERE batch_id = ? ORDER BY position",
+                (batch_id,),
+            ).fetchall()
+        return [_job_dict(row) for row in rows]
+
+    def latest_batch(self, candidate_id):
+        """Id of the candidate's most recent batch, or None."""
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT batch_id FROM job_batches WHERE candidate_id = ? ORDER BY created_at DESC LIMIT 1",
+                (candidate_id,),
+            ).fetchone()
+        return row["batch_id"] if row else None
+
+    def mark_batch_applied(self, batch_id):
+        """
+        Record that the batch's results were applied (e.g. to the checklist).
+
+        Returns:
+            bool: True for the first caller only, so results are applied once.
+        """
+        with self._conn() as conn:
+            cursor = conn.execute(
+                "UPDATE job_batches SET applied_at = ? WHERE batch_id = ? AND applied_at IS NULL",
+                (time.time(), batch_id),
+            )
+            return cursor.rowcount == 1
+
+    def counts(self):
+        """Number of jobs per status."""
+        with self._conn() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def _job_dict(row):
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def run_validation_job(payload, registry):
+    """
+    Validate one document for a VALIDATION_JOB.
+
+    Returns:
+        dict: The validation report; reports with an "error" key count as a failed attempt.
+              Its "stage_spans" are the timing spans recorded while validating, so the
+              submitting session can add them to its trace.
+    """
+    report, spans = collect_spans(process_document, payload["path"], registry)
+    return {**report, "stage_spans": spans}
+
+
+class JobWorkerPool:
+    """
+    Background threads draining a JobQueue.
+
+    Each thread claims one job at a time and runs its handler; a heartbeat thread
+    renews the leases of all jobs in progress every third of the lease time.
+    """
+
+    def __init__(self, queue, handlers, workers, poll_seconds=JOB_POLL_SECONDS):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._active = set()
+        self._active_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        return self
+
+    def stop(self, timeout=None):
+        """Stop claiming jobs and wait for jobs in progress to finish."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(self.owner, kinds=list(self.handlers))
+            except sqlite3.Error:
+                logger.warning("Could not claim a job; retrying", exc_info=True)
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_seconds)
+                continue
+            try:
+                self.run_job(job)
+            except sqlite3.Error:
+                logger.exception("Job %s failed with a database error; it will run again after its lease expires",
+                                 job["id"])
+
+    def run_job(self, job):
+        """
+        Run job's handler and record its result.
+
+        Database errors while recording are logged, not raised, so the worker thread
+        survives; the job's lease then expires and it is run again.
+        """
+        with self._active_lock:
+            self._active.add(job["id"])
+        try:
+            try:
+                result = self.handlers[job["kind"]](job["payload"])
+                error = result["error"] if isinstance(result, dict) and "error" in result else None
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+            try:
+                if error is not None:
+                    self.queue.fail(job["id"], self.owner, error, result)
+                else:
+                    self.queue.complete(job["id"], self.owner, result)
+            except sqlite3.Error:
+                logger.exception("Could not record the result of job %s; it will run again after its lease expires",
+                                 job["id"])
+        finally:
+            with self._active_lock:
+                self._active.discard(job["id"])
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            with self._active_lock:
+                active = list(self._active)
+            try:
+                self.queue.renew(active, self.owner)
+            except sqlite3.Error:
+                logger.warning("Could not renew job leases", exc_info=True)
+
+
+def validation_handlers(registry=None):
+    """Handlers for JobWorkerPool that validate documents against registry (loaded if not given)."""
+    registry = registry if registry is not None else load_nursing_license_registry()
+    return {VALIDATION_JOB: lambda payload: run_validation_job(payload, registry)}
+
+
+_queue = None
+_pool = None
+_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide JobQueue, creating it on first use."""
+    global _queue
+    with _lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def ensure_worker_pool(registry=None, workers=JOB_WORKERS_IN_PROCESS):
+    """
+    Start the in-process worker pool once, unless workers is 0.
+
+    Returns:
+        JobWorkerPool | None: The running pool, or None when jobs are left to standalone workers.
+    """
+    global _pool
+    queue = get_job_queue()
+    with _lock:
+        if _pool is None and workers > 0:
+            _pool = JobWorkerPool(queue, validation_handlers(registry), workers).start()
+        return _pool
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run validation workers for the onboarding job queue.")
+    parser.add_argument("--workers", type=int, default=VALIDATION_MAX_WORKERS, help="Worker threads")
+    args = parser.parse_args(argv)
+
+    queue = get_job_queue()
+    pool = JobWorkerPool(queue, validation_handlers(), max(1, args.workers)).start()
+    print(f"Worker {pool.owner} running {pool.workers} thread(s) on {queue.db_path}; Ctrl-C to stop.", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(60)
+            print(f"Jobs by status: {queue.counts()}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Stopping; waiting for jobs in progress.", file=sys.stderr)
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
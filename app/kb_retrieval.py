@@ -0,0 +1,185 @@
+import hashlib
+import math
+import os
+import re
+import threading
+import uuid
+from typing import Dict, List
+
+import chromadb
+from chromadb.api.types import EmbeddingFunction
+
+from app.chat_context import count_tokens
+from app.kb_store import get_kb_store
+from app.onboarding_checklist import DOCUMENT_FIELD_MAPPING
+
+# Passages included in a chatbot prompt, and the tokens pending issues may take before
+# only those most relevant to the question are included
+KB_RETRIEVAL_TOP_K = int(os.getenv("KB_RETRIEVAL_TOP_K", "3"))
+ISSUE_CONTEXT_TOKEN_BUDGET = int(os.getenv("ISSUE_CONTEXT_TOKEN_BUDGET", "1000"))
+EMBEDDING_DIMENSIONS = 512
+
+# HR policy passages indexed alongside the validation KB
+HR_POLICY_SNIPPETS = [
+    "Escalation to HR: if a candidate is frustrated or an issue cannot be resolved in chat, the assistant "
+    "offers to escalate. The candidate's full name and a brief description of the issue are recorded and "
+    "HR follows up on open escalations.",
+    "Critical validation issues, such as a nursing license that fails verification against the official "
+    "database, are escalated to HR.",
+    "Re-uploading documents: a clear, complete scan or photo of the original document can be uploaded again "
+    "and re-validated at any time.",
+] + [
+    f"Required fields for a {doc_type}: "
+    + ", ".join(field.replace("_", " ") for field in fields if field != "database_check") + "."
+    + (" The license is also verified against the official nursing license database." if "database_check" in fields else "")
+    for doc_type, fields in DOCUMENT_FIELD_MAPPING.items()
+]
+
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """
+    Offline embedding function: feature-hashed word and character-trigram counts.
+
+    Needs no model download or network access. Captures lexical overlap, including
+    partial word matches, which is enough to rank a small KB against user questions.
+    """
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def __call__(self, input):
+        return [embed_text(text, self.dimensions) for text in input]
+
+    @staticmethod
+    def name() -> str:
+        return "onboarding-hashing"
+
+    def get_config(self) -> Dict:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: Dict) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(config.get("dimensions", EMBEDDING_DIMENSIONS))
+
+    def default_space(self):
+        return "cosine"
+
+
+def embed_text(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """L2-normalized hashed bag of words and character trigrams of text."""
+    vector = [0.0] * dimensions
+    for word in re.findall(r"[a-z0-9]+", (text or "").lower()):
+        features = [word] + [word[i:i + 3] for i in range(len(word) - 2)] if len(word) > 3 else [word]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % dimensions
+            # The sign bit keeps hash collisions from always adding up
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm == 0:
+        # Chroma rejects all-zero vectors; use a fixed unit vector for text with no features
+        vector[0] = 1.0
+        return vector
+    return [value / norm for value in vector]
+
+
+def kb_entry_text(entry: dict) -> str:
+    """Passage text for a validation KB entry."""
+    parts = [f"{entry.get('title', '')}: {entry.get('description', '')}"]
+    if entry.get("possible_causes"):
+        parts.append("Possible causes: " + "; ".join(entry["possible_causes"]))
+    if entry.get("recommended_actions"):
+        parts.append("Recommended actions: " + "; ".join(entry["recommended_actions"]))
+    return "\n".join(parts)
+
+
+class KBRetriever:
+    """
+    Local semantic index over validation KB entries and HR policy snippets.
+
+    Uses an in-memory Chroma collection with HashingEmbeddingFunction. The index is
+    rebuilt when the KB store reloads its file.
+    """
+
+    def __init__(self, kb_store=None):
+        self.kb_store = kb_store or get_kb_store()
+        self.embedding_function = HashingEmbeddingFunction()
+        self._client = chromadb.EphemeralClient()
+        self._collection = None
+        self._indexed_entries = None
+        self._lock = threading.Lock()
+
+    def _collection_for_current_kb(self):
+        entries = self.kb_store.entries()
+        with self._lock:
+            if self._collection is None or entries is not self._indexed_entries:
+                collection = self._client.create_collection(
+                    name=f"onboarding_kb_{uuid.uuid4().hex}",
+                    embedding_function=self.embedding_function,
+                    metadata={"hnsw:space": "cosine"},
+                )
+                documents = [kb_entry_text(entry) for entry in entries] + HR_POLICY_SNIPPETS
+                metadatas = (
+                    [{"source": "kb", "issue_code": str(entry.get("issue_code", ""))} for entry in entries]
+                    + [{"source": "policy", "issue_code": ""} for _ in HR_POLICY_SNIPPETS]
+                )
+                collection.add(
+                    ids=[f"doc-{i}" for i in range(len(documents))],
+                    documents=documents,
+                    metadatas=metadatas,
+                )
+                if self._collection is not None:
+                    self._client.delete_collection(self._collection.name)
+                self._collection, self._indexed_entries = collection, entries
+            return self._collection
+
+    def search(self, query: str, k: int = KB_RETRIEVAL_TOP_K) -> List[str]:
+        """Return the text of the k passages most relevant to query."""
+        collection = self._collection_for_current_kb()
+        count = collection.count()
+        if not query or count == 0:
+            return []
+        result = collection.query(query_texts=[query], n_results=min(k, count))
+        return result["documents"][0]
+
+
+def rank_issues(query: str, issues: Dict[str, str], token_budget: int = ISSUE_CONTEXT_TOKEN_BUDGET) -> Dict[str, str]:
+    """
+    Return the pending validation issues to include in the prompt for query, keeping their original order.
+
+    All issues are returned while they fit in token_budget, so general questions see
+    every issue. Beyond that, the issues most relevant to query are kept until the
+    budget is used up (always at least one).
+
+    Args:
+        query (str): The user's message.
+        issues (dict): Issue key -> notes, as kept in st.session_state.pending_validation_issues.
+    """
+    costs = {key: count_tokens(f"{key} {note}") for key, note in issues.items()}
+    if sum(costs.values()) <= token_budget:
+        return dict(issues)
+    query_vector = embed_text(query)
+    scores = {
+        key: sum(a * b for a, b in zip(query_vector, embed_text(f"{key.replace('_', ' ')} {note}")))
+        for key, note in issues.items()
+    }
+    selected, used = set(), 0
+    for key in sorted(scores, key=scores.get, reverse=True):
+        if selected and used + costs[key] > token_budget:
+            break
+        selected.add(key)
+        used += costs[key]
+    return {key: note for key, note in issues.items() if key in selected}
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+
+def get_kb_retriever() -> KBRetriever:
+    """Return the process-wide KBRetriever, creating it on first use."""
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = KBRetriever()
+        return _retriever
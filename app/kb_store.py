@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+VALIDATION_KB_PATH = Path(os.getenv("VALIDATION_KB_PATH", str(Path(__file__).parent / "kb" / "validation_kb.json")))
+# Minimum seconds between checks of the KB file's mtime
+KB_RELOAD_CHECK_SECONDS = float(os.getenv("KB_RELOAD_CHECK_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class ValidationKBStore:
+    """
+    Validation knowledge base loaded once per process and indexed by issue_code.
+
+    Lookups are served from memory. The file's mtime is checked at most every
+    check_interval seconds, and the KB is reloaded when it has changed. A missing
+    file is treated as an empty KB until it appears. A file that cannot be parsed
+    (e.g. caught mid-write) is ignored: the last good KB is kept and the file is
+    read again at the next check.
+    """
+
+    def __init__(self, kb_path=VALIDATION_KB_PATH, check_interval=KB_RELOAD_CHECK_SECONDS):
+        self.kb_path = Path(kb_path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self._entries: List[dict] = []
+        self._index: Dict[str, List[dict]] = {}
+        self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        with self._lock:
+            if not force and now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime = self.kb_path.stat().st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime == self._mtime and not force:
+                return
+
+            entries = []
+            if mtime is not None:
+                try:
+                    with open(self.kb_path, "r", encoding="utf-8") as f:
+                        entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    # Leave _mtime unchanged so the next check tries again
+                    logger.warning("Could not load the validation KB from %s; keeping the last good copy: %s",
+                                   self.kb_path, e)
+                    return
+            index = {}
+            for entry in entries:
+                index.setdefault(entry.get("issue_code"), []).append(entry)
+            # Swap both together so readers never see a half-built index
+            self._entries, self._index = entries, index
+            self._mtime = mtime
+
+    def entries(self) -> List[dict]:
+        """All KB entries, in file order."""
+        self._maybe_reload()
+        return self._entries
+
+    def get(self, issue_code: str) -> List[dict]:
+        """KB entries for one issue code."""
+        self._maybe_reload()
+        return self._index.get(issue_code, [])
+
+    def get_many(self, issue_codes: List[str]) -> List[dict]:
+        """KB entries for each issue code, grouped in the order the codes are given."""
+        self._maybe_reload()
+        index = self._index
+        matched_entries = []
+        for code in issue_codes:
+            matched_entries.extend(index.get(code, []))
+        return matched_entries
+
+
+_stores: Dict[Path, ValidationKBStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_kb_store(kb_path=None) -> ValidationKBStore:
+    """Return the process-wide store for kb_path (default VALIDATION_KB_PATH), creating it on first use."""
+    path = Path(kb_path) if kb_path else VALIDATION_KB_PATH
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ValidationKBStore(path)
+        return _stores[path]
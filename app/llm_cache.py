@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+# Optional SQLite file shared across processes and restarts; empty keeps the cache in memory only
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse runs of whitespace so formatting-only differences share a cache entry."""
+    return re.sub(r"\s+", " ", prompt or "").strip()
+
+
+def llm_cache_key(prompt: str, model: str, temperature: float) -> str:
+    payload = json.dumps([normalize_prompt(prompt), model, round(float(temperature), 4)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Cache of LLM responses keyed on normalized prompt, model and temperature.
+
+    Entries expire after ttl_seconds, and the in-memory map holds at most
+    max_entries, evicting the least recently used. With db_path set, entries are
+    also written to SQLite so other processes and restarts can reuse them.
+    Concurrent requests for the same key share one upstream call (single-flight).
+    """
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS, db_path=LLM_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        """Return the cached response for key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            value = self._recall(key, now)
+            if value is not None:
+                self.hits += 1
+                return value
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[1], row[0])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+                )
+                self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def _recall(self, key, now):
+        """Return the unexpired in-memory response for key, or None. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _remember(self, key, expires_at, value):
+        """Store in the in-memory LRU map. Caller holds the lock."""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, prompt, model, temperature, compute, cacheable=lambda value: True):
+        """
+        Return the cached response for (prompt, model, temperature), calling compute() on a miss.
+
+        If another thread is already computing the same key, wait for its result
+        instead of making a second upstream call. Results for which cacheable(result)
+        is False (e.g. error messages) are returned but not stored.
+        """
+        key = llm_cache_key(prompt, model, temperature)
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            # A leader may have stored the result and finished since the lookup above
+            value = self._recall(key, time.time())
+            if value is not None:
+                return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = compute()
+            if cacheable(value):
+                self.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Return the process-wide LLMResponseCache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
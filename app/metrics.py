@@ -0,0 +1,294 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Prometheus text file rewritten every METRICS_EXPORT_SECONDS; set METRICS_PORT to also serve /metrics
+METRICS_EXPORT_PATH = Path(os.getenv("METRICS_EXPORT_PATH", "data/metrics/onboarding.prom"))
+METRICS_EXPORT_SECONDS = float(os.getenv("METRICS_EXPORT_SECONDS", "15"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Histogram bucket upper bounds for stage durations, in seconds
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Spans of the current session are appended to the SessionTrace held here
+_current_trace = contextvars.ContextVar("onboarding_session_trace", default=None)
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, rendered in the Prometheus text format."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bisect.bisect_left(self.buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h[0]), h[1], h[2]) for key, h in self._histograms.items()}
+
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines += self._header(name, "counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines += self._header(name, "histogram")
+            for (metric, labels), (bucket_counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _header(self, name, metric_type):
+        header = [f"# HELP {name} {self._help[name]}"] if name in self._help else []
+        return header + [f"# TYPE {name} {metric_type}"]
+
+    def write(self, path=METRICS_EXPORT_PATH):
+        """Atomically rewrite path with the current metrics."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(self.render())
+        os.replace(tmp_path, path)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+_registry = MetricsRegistry()
+_registry.describe("onboarding_stage_duration_seconds", "Time spent in each onboarding stage.")
+_registry.describe("onboarding_stage_total", "Completed onboarding stage spans by outcome.")
+_registry.describe("onboarding_stage_bytes_total", "Bytes sent and received per onboarding stage.")
+_registry.describe("http_retries_total", "Upstream requests retried after a 429/5xx or connection error.")
+
+
+def get_metrics_registry():
+    """Return the process-wide MetricsRegistry."""
+    return _registry
+
+
+class SessionTrace:
+    """Spans recorded for one user session, for the sidebar debug panel."""
+
+    def __init__(self, max_spans=500):
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self.spans = []
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+            if len(self.spans) > self.max_spans:
+                del self.spans[:len(self.spans) - self.max_spans]
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+    def breakdown(self):
+        """
+        Aggregate the recorded spans per stage.
+
+        Returns:
+            list: One dict per stage with count, total/mean/max milliseconds, errors
+                  and bytes sent/received, slowest total first.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        stages = {}
+        for span in spans:
+            row = stages.setdefault(span["stage"], {
+                "stage": span["stage"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "errors": 0, "bytes_sent": 0, "bytes_received": 0,
+            })
+            row["count"] += 1
+            row["total_ms"] += span["duration_ms"]
+            row["max_ms"] = max(row["max_ms"], span["duration_ms"])
+            row["errors"] += span["outcome"] != "ok"
+            row["bytes_sent"] += span["bytes_sent"]
+            row["bytes_received"] += span["bytes_received"]
+        for row in stages.values():
+            row["mean_ms"] = round(row["total_ms"] / row["count"], 1)
+            row["total_ms"] = round(row["total_ms"], 1)
+            row["max_ms"] = round(row["max_ms"], 1)
+        return sorted(stages.values(), key=lambda row: row["total_ms"], reverse=True)
+
+
+def set_session_trace(trace):
+    """Record spans started from the current context (and contexts copied from it) into trace."""
+    return _current_trace.set(trace)
+
+
+def collect_spans(fn, *args, **kwargs):
+    """
+    Run fn in a fresh context with its own trace, e.g. on a job worker thread.
+
+    Returns:
+        tuple: fn's result, and the span records it produced, ready to be added to
+               the trace of the session that requested the work.
+    """
+    trace = SessionTrace()
+
+    def run():
+        set_session_trace(trace)
+        return fn(*args, **kwargs)
+
+    result = contextvars.copy_context().run(run)
+    return result, trace.spans
+
+
+class Span:
+    """An in-progress timing span; add byte counts or mark an error before it ends."""
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.outcome = "ok"
+
+    def add_bytes(self, sent=0, received=0):
+        self.bytes_sent += sent or 0
+        self.bytes_received += received or 0
+
+    def fail(self):
+        self.outcome = "error"
+
+
+@contextmanager
+def span(stage, **labels):
+    """
+    Time a block as one onboarding stage.
+
+    Records a duration histogram, an outcome counter and byte counters in the
+    process-wide registry, and appends the span to the current session's trace,
+    if any. Exceptions mark the span as an error and are re-raised.
+
+    Usage:
+        with span("azure_request") as s:
+            ...
+            s.add_bytes(sent=len(body), received=len(response.content))
+    """
+    current = Span(stage, labels)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        current.outcome = "error"
+        raise
+    finally:
+        record(stage, time.perf_counter() - start, current.bytes_sent, current.bytes_received,
+               current.outcome, **labels)
+
+
+def record(stage, duration, bytes_sent=0, bytes_received=0, outcome="ok", **labels):
+    """Record a stage that was timed elsewhere (e.g. accumulated over many small steps) as one span."""
+    _registry.observe("onboarding_stage_duration_seconds", duration, stage=stage, **labels)
+    _registry.inc("onboarding_stage_total", stage=stage, outcome=outcome, **labels)
+    if bytes_sent:
+        _registry.inc("onboarding_stage_bytes_total", bytes_sent, stage=stage, direction="sent", **labels)
+    if bytes_received:
+        _registry.inc("onboarding_stage_bytes_total", bytes_received, stage=stage, direction="received", **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add({
+            "stage": stage,
+            "started_at": time.time() - duration,
+            "duration_ms": duration * 1000,
+            "outcome": outcome,
+            "bytes_sent": bytes_sent,
+            "bytes_received": bytes_received,
+        })
+
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    """executor.submit that runs fn in a copy of the caller's context, so spans reach its session trace."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+
+def start_metrics_exporter(path=METRICS_EXPORT_PATH, interval=METRICS_EXPORT_SECONDS, port=METRICS_PORT):
+    """
+    Start exporting metrics in the background; later calls do nothing.
+
+    The Prometheus text file at path is rewritten every interval seconds (a
+    node_exporter textfile collector can pick it up), and if port is non-zero
+    /metrics is also served over HTTP on that port.
+    """
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    def export_loop():
+        while True:
+            try:
+                _registry.write(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+
+    threading.Thread(target=export_loop, name="metrics-exporter", daemon=True).start()
+    if port:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
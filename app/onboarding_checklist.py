@@ -79,3 +79,25 @@ def update_checklist(checklist, document_type, validation_results, notes=None):
         checklist[document_type]["notes"] += notes
 
     return checklist
+
+def calculate_onboarding_progress(checklist):
+    """
+    Calculate onboarding progress as % of documents fully validated.
+    Only count fields if the entire document is validated (all fields PASS).
+    """
+    total_fields = 0
+    passed_fields = 0
+
+    for doc_data in checklist.values():
+        fields = doc_data.get("required_fields", {})
+        total_fields += len(fields)
+        # Check if all fields passed
+        all_passed = all(status == "PASS" for status in fields.values())
+        if all_passed:
+            # Count all fields as passed only if all passed
+            passed_fields += len(fields)
+        # else do not count any fields from this document
+
+    if total_fields == 0:
+        return 0
+    return round((passed_fields / total_fields) * 100, 2)
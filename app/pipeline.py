@@ -0,0 +1,52 @@
+import os
+
+from app.validator import validate_document_http
+from app.db_utils import verify_nursing_license
+from app.metrics import span
+
+# Documents validated concurrently: the default number of validation job workers
+VALIDATION_MAX_WORKERS = int(os.getenv("VALIDATION_MAX_WORKERS", "4"))
+
+
+def database_check_result(extracted_info, registry):
+    """
+    Verify extracted nursing license data against the registry.
+
+    Returns:
+        dict: Validation entry for the "database_check" field with 'status' and 'notes'.
+    """
+    with span("verify_license"):
+        is_valid, matched_record, mismatches = verify_nursing_license(extracted_info, registry)
+    if is_valid:
+        return {
+            "status": "PASS",
+            "notes": "Nursing license data verified successfully against database."
+        }
+
+    notes = "Nursing license data does not match database records."
+    if mismatches:
+        notes += "\nMismatched fields:\n"
+        for field, (extracted_val, db_val) in mismatches.items():
+            notes += f"- {field}: extracted='{extracted_val}', db='{db_val}'\n"
+    return {
+        "status": "FAIL",
+        "notes": notes
+    }
+
+
+def process_document(path, registry):
+    """
+    Validate one document and, for nursing licenses, check it against the registry.
+
+    Returns:
+        dict: Validation report; nursing licenses get an extra "database_check" entry.
+    """
+    report = validate_document_http(path)
+
+    if report.get("document_type") == "Nursing License":
+        validation_results = report.get("validation", {})
+        validation_results["database_check"] = database_check_result(report.get("extracted_info", {}), registry)
+        # Update report validation so UI shows DB check status
+        report["validation"] = validation_results
+
+    return report
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+REPORT_CACHE_DIR = Path(os.getenv("REPORT_CACHE_DIR", "data/cache/reports"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+REPORT_CACHE_MAX_AGE_SECONDS = float(os.getenv("REPORT_CACHE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def document_cache_key(file_path, *parts):
+    """
+    Content-addressed cache key for a document.
+
+    Hashes the file bytes (read in chunks) together with parts such as the prompt and
+    model deployment, so a change to either yields a new key.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    for part in parts:
+        digest.update(b"\0" + str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """
+    Persistent cache of validation reports, one JSON file per key.
+
+    Entries older than max_age_seconds are dropped on lookup, and once the cache
+    grows past max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_BYTES,
+                 max_age_seconds=REPORT_CACHE_MAX_AGE_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        """Return the cached report for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age > self.max_age_seconds:
+                self._remove(path)
+                report = None
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    report = json.load(f)
+                # Touch the entry so eviction treats it as recently used
+                os.utime(path)
+        except (OSError, ValueError):
+            report = None
+
+        with self._lock:
+            if report is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return report
+
+    def put(self, key, report):
+        """Store report under key, evicting old entries if the cache is over its size limit."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(report).encode("utf-8")
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _entries(self):
+        return list(self.cache_dir.glob("*/*.json"))
+
+    def _disk_usage(self):
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _remove(self, path):
+        try:
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            self.evictions += 1
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until under 90% of max_bytes. Caller holds the lock."""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        now = time.time()
+        size = sum(entry[1] for entry in entries)
+        target = self.max_bytes * 0.9
+        for mtime, entry_size, path in entries:
+            if size <= target and now - mtime <= self.max_age_seconds:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            self.evictions += 1
+        self._size = size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache():
+    """Return the process-wide ReportCache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReportCache()
+        return _cache
@@ -0,0 +1,40 @@
+import sqlite3
+
+
+class Transaction:
+    """Context manager running a block in an IMMEDIATE transaction on an autocommit connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def connect_wal(db_path, row_factory=None, timeout=30):
+    """Open an autocommit connection to db_path in WAL mode, for use with Transaction."""
+    conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    return conn
+
+
+def thread_transaction(local, db_path, row_factory=None):
+    """
+    Return a Transaction on the calling thread's connection to db_path.
+
+    Args:
+        local (threading.local): Per-store holder of the thread's connection,
+                                 opened with connect_wal on first use.
+    """
+    conn = getattr(local, "conn", None)
+    if conn is None:
+        conn = local.conn = connect_wal(db_path, row_factory)
+    return Transaction(conn)
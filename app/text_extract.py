@@ -0,0 +1,206 @@
+import os
+import re
+import threading
+from datetime import datetime
+
+import pypdfium2 as pdfium
+
+from app.db_utils import normalize_date
+from app.onboarding_checklist import DOCUMENT_FIELD_MAPPING
+
+# Set to 0 to always send PDFs to the vision model
+TEXT_LAYER_ENABLED = os.getenv("TEXT_LAYER_ENABLED", "1") != "0"
+# Pages read from the text layer, and the non-whitespace characters needed to trust it
+TEXT_LAYER_MAX_PAGES = int(os.getenv("TEXT_LAYER_MAX_PAGES", "10"))
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "40"))
+
+# Bump when the classifier or parsers change so cached reports are not reused
+TEXT_EXTRACTION_VERSION = 1
+
+# pdfium is not thread-safe, so all access to it goes through one lock
+PDFIUM_LOCK = threading.Lock()
+
+# Keywords voting for each document type; the type needs at least
+# CLASSIFY_MIN_HITS distinct keywords and more than any other type
+DOCUMENT_KEYWORDS = {
+    "Employment Contract": [
+        "employment contract", "employment agreement", "contract of employment", "employee", "employer",
+        "commencement", "start date", "position", "job title", "salary", "probation", "notice period",
+    ],
+    "Nursing License": [
+        "nursing", "nurse", "midwife", "midwifery", "council", "license", "licence", "registration",
+        "to practice as", "to practise as", "valid until",
+    ],
+}
+CLASSIFY_MIN_HITS = 3
+
+# Field label patterns: the value is the rest of the line after the label and a ':' or '-'
+_LABEL_VALUE = r"[ \t]*[:\-][ \t]*(?P<value>[^\n]+)"
+FIELD_PATTERNS = {
+    "Employment Contract": {
+        "employee_name": [r"employee(?:'s)?\s+name", r"name\s+of\s+(?:the\s+)?employee", r"employee"],
+        "start_date": [r"start(?:ing)?\s+date", r"commencement\s+date", r"date\s+of\s+(?:joining|commencement)"],
+        "position": [r"position", r"job\s+title", r"designation", r"role"],
+        "signature": [r"employee(?:'s)?\s+signature", r"signed\s+by", r"signature", r"signed"],
+    },
+    "Nursing License": {
+        "name": [r"full\s+name", r"name\s+of\s+(?:the\s+)?(?:nurse|holder|licensee)", r"name"],
+        "date_of_birth": [r"date\s+of\s+birth", r"d\.?o\.?b\.?", r"birth\s+date"],
+        "license_number": [r"licen[cs]e\s+(?:no\.?|number|#)", r"registration\s+(?:no\.?|number|#)", r"reg\.?\s+no\.?"],
+        "gender": [r"gender", r"sex"],
+        "to_practice_as": [r"to\s+practi[cs]e\s+as", r"field\s+of\s+practi[cs]e", r"category"],
+        "valid_until": [r"valid\s+(?:until|till|up\s*to|through)", r"expiry\s+date", r"expires(?:\s+on)?", r"date\s+of\s+expiry"],
+    },
+}
+
+DATE_FIELDS = {"start_date", "date_of_birth", "valid_until"}
+_DATE_FORMATS = (
+    "%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y", "%d %B %Y", "%d %b %Y", "%B %d, %Y", "%b %d, %Y", "%B %d %Y",
+)
+_GENDERS = {"m": "M", "male": "M", "f": "F", "female": "F"}
+
+
+def extract_pdf_text(file_path, max_pages=TEXT_LAYER_MAX_PAGES):
+    """
+    Read the text layer of up to max_pages pages of a PDF.
+
+    Returns:
+        list: One string per page read (empty for pages without text).
+    """
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(str(file_path))
+        try:
+            pages = []
+            for index in range(min(len(pdf), max_pages)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    pages.append(textpage.get_text_range())
+                finally:
+                    textpage.close()
+                    page.close()
+            return pages
+        finally:
+            pdf.close()
+
+
+def has_text_layer(text, min_chars=TEXT_LAYER_MIN_CHARS):
+    """True if text has enough non-whitespace characters to be a real text layer rather than a scan."""
+    return len(re.sub(r"\s", "", text)) >= min_chars
+
+
+def classify_document(text):
+    """
+    Guess the document type from keywords.
+
+    Returns:
+        str | None: A DOCUMENT_FIELD_MAPPING type, or None if no type clearly wins.
+    """
+    lowered = text.lower()
+    scores = {
+        doc_type: sum(1 for keyword in keywords if keyword in lowered)
+        for doc_type, keywords in DOCUMENT_KEYWORDS.items()
+    }
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_type, best_score = ranked[0]
+    if best_score < CLASSIFY_MIN_HITS or (len(ranked) > 1 and ranked[1][1] == best_score):
+        return None
+    return best_type
+
+
+def parse_date(value):
+    """Return value as a date normalize_date understands (dd/mm/yyyy if reformatted), or None."""
+    value = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", value.strip().rstrip("."))
+    if normalize_date(value):
+        return value
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%d/%m/%Y")
+        except ValueError:
+            continue
+    return None
+
+
+def _clean_value(field, value):
+    """Validate and tidy a raw labelled value; None if it does not look like a real value."""
+    value = value.strip().strip(".,;")
+    # Blank form lines: underscores, dots or dashes only
+    if not value or re.fullmatch(r"[_.\-\s]+", value):
+        return None
+    if field in DATE_FIELDS:
+        date_match = re.search(
+            r"\d{1,2}(?:st|nd|rd|th)?[/\-. ]\s*(?:\d{1,2}|[A-Za-z]{3,9})[/\-. ,]\s*\d{4}"
+            r"|\d{4}-\d{2}-\d{2}|[A-Za-z]{3,9} \d{1,2},? \d{4}",
+            value,
+        )
+        return parse_date(date_match.group(0)) if date_match else None
+    if field == "gender":
+        return _GENDERS.get(value.split()[0].lower())
+    if field == "license_number":
+        number = re.match(r"[A-Za-z0-9][A-Za-z0-9/\-]*", value)
+        return number.group(0) if number and re.search(r"\d", number.group(0)) else None
+    if field == "signature":
+        # Only an explicit digital signature counts; a signature image needs the vision model
+        digital = re.match(r"(?:/s/|digitally\s+signed\s+by)\s*(.+)", value, re.IGNORECASE)
+        return digital.group(1).strip() if digital else None
+    # Values run to the end of the line; cut off a following label on the same line
+    value = re.split(r"\s{3,}|\t", value)[0]
+    return value if re.search(r"[A-Za-z]", value) else None
+
+
+def parse_fields(document_type, text):
+    """
+    Fill the document type's fields from "Label: value" lines.
+
+    Returns:
+        dict: Field -> value for the fields that were found and look valid.
+    """
+    found = {}
+    for field, labels in FIELD_PATTERNS.get(document_type, {}).items():
+        for label in labels:
+            for match in re.finditer(r"(?im)^[ \t]*" + label + _LABEL_VALUE, text):
+                value = _clean_value(field, match.group("value"))
+                if value:
+                    found[field] = value
+                    break
+            if field in found:
+                break
+    return found
+
+
+def extract_text_report(file_path):
+    """
+    Build a validation report for a PDF from its text layer alone.
+
+    Returns:
+        dict | None: A report in the vision model's format with the fields that were
+                     resolved, or None if the PDF has no usable text layer or its
+                     document type could not be determined.
+        list: Required fields that were not resolved and still need the vision model.
+    """
+    if not TEXT_LAYER_ENABLED:
+        return None, []
+    try:
+        text = "\n".join(extract_pdf_text(file_path))
+    except pdfium.PdfiumError:
+        return None, []
+    if not has_text_layer(text):
+        return None, []
+
+    document_type = classify_document(text)
+    if document_type is None:
+        return None, []
+
+    required = [field for field in DOCUMENT_FIELD_MAPPING[document_type] if field != "database_check"]
+    extracted_info = parse_fields(document_type, text)
+    unresolved = [field for field in required if field not in extracted_info]
+    report = {
+        "document_type": document_type,
+        "validation": {
+            field: {"status": "PASS", "notes": "Read from the PDF text layer."} for field in extracted_info
+        },
+        "extracted_info": extracted_info,
+        "notes": "",
+        "extraction": "text_layer" if not unresolved else "text_layer+vision",
+    }
+    return report, unresolved
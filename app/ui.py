@@ -1,47 +1,89 @@
 import streamlit as st
-import copy
 import os
-import requests
+import uuid
 from dotenv import load_dotenv
-from app.handlers import save_uploaded_files
-from app.validator import validate_document_http
-from app.onboarding_checklist import ONBOARDING_CHECKLIST_TEMPLATE, update_checklist
-from app.db_utils import load_nursing_license_db, verify_nursing_license
-from app.chatbot import get_chatbot_response
+from app.handlers import UploadLimitError, check_upload_limits, save_uploaded_files
+from app.job_queue import FINISHED_STATUSES, JOB_POLL_SECONDS, VALIDATION_JOB, ensure_worker_pool, get_job_queue
+from app.onboarding_checklist import ONBOARDING_CHECKLIST_TEMPLATE, calculate_onboarding_progress
+from app.checklist_state_manager import load_checklist, update_candidate_checklist
+from app.db_utils import load_nursing_license_registry
+from app.chatbot import get_chatbot_response, stream_groq_chat
+from app.http_client import get_http_client
+from app.kb_store import get_kb_store
+from app.kb_retrieval import get_kb_retriever, rank_issues
+from app.chat_context import ChatContextManager
+from app.validator import validation_cache_key
 import re
 import json
 from datetime import datetime
 from .hr_utils import save_escalation
 
-# Load nursing license DB once on app start
-nursing_license_db = load_nursing_license_db()
 
-def calculate_onboarding_progress(checklist):
+@st.cache_resource(show_spinner="Loading nursing license registry...")
+def get_nursing_license_registry():
+    """The nursing license registry, loaded once and shared by all sessions."""
+    return load_nursing_license_registry()
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_resources():
     """
-    Calculate onboarding progress as % of documents fully validated.
-    Only count fields if the entire document is validated (all fields PASS).
+    Create the process-wide resources once, on the first run rather than at import.
+
+    Returns:
+        dict: The HTTP client, KB store and retriever, and the validation worker pool
+              (None if JOB_WORKERS_IN_PROCESS=0).
     """
-    total_fields = 0
-    passed_fields = 0
+    return {
+        "http_client": get_http_client(),
+        "kb_store": get_kb_store(),
+        "kb_retriever": get_kb_retriever(),
+        "worker_pool": ensure_worker_pool(get_nursing_license_registry()),
+    }
 
-    for doc_data in checklist.values():
-        fields = doc_data.get("required_fields", {})
-        total_fields += len(fields)
-        # Check if all fields passed
-        all_passed = all(status == "PASS" for status in fields.values())
-        if all_passed:
-            # Count all fields as passed only if all passed
-            passed_fields += len(fields)
-        # else do not count any fields from this document
 
-    if total_fields == 0:
-        return 0
-    return round((passed_fields / total_fields) * 100, 2)
+def upload_cache_key(file):
+    """Identify an upload across reruns: Streamlit's file_id, or name and size on older versions."""
+    return getattr(file, "file_id", None) or f"{file.name}:{file.size}"
+
+
+def save_new_uploads(uploaded_files, candidate_id):
+    """
+    Save only the uploads this session has not saved yet for candidate_id.
+
+    Saved paths are kept in the session, so reruns with the same files do no disk writes.
+
+    Returns:
+        list: Saved paths, in the order of uploaded_files.
+    """
+    saved = st.session_state.setdefault("saved_uploads", {})
+    check_upload_limits(uploaded_files)
+    keys = [(candidate_id, upload_cache_key(file)) for file in uploaded_files]
+    new_files = [
+        (key, file) for key, file in zip(keys, uploaded_files)
+        if key not in saved or not os.path.exists(saved[key])
+    ]
+    if new_files:
+        paths = save_uploaded_files([file for _, file in new_files], candidate_id)
+        for (key, _), path in zip(new_files, paths):
+            saved[key] = path
+    return [saved[key] for key in keys]
+
+def get_session_id():
+    """Random id identifying the current browser session."""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
 
 
 def upload_section():
     st.header("Upload Onboarding Documents")
 
+    # Checklists are stored per candidate; default to one per browser session. Ids are
+    # trusted as typed: anyone who enters a candidate's id can see and change their checklist,
+    # so deployments with untrusted users must put authentication in front of the app.
+    candidate_id = st.text_input("Candidate ID", value=get_session_id()).strip() or get_session_id()
+
     uploaded_files = st.file_uploader(
         "Choose files (PDF, images, or scans)",
         accept_multiple_files=True,
@@ -49,76 +91,169 @@ def upload_section():
     )
 
     if uploaded_files:
-        saved_paths = save_uploaded_files(uploaded_files)
+        try:
+            saved_paths = save_new_uploads(uploaded_files, candidate_id)
+        except UploadLimitError as e:
+            st.error(f"❌ {e}")
+            return
         st.success(f"{len(saved_paths)} file(s) saved to disk.")
 
-        checklist = copy.deepcopy(ONBOARDING_CHECKLIST_TEMPLATE)
-
         if st.button("Validate Documents"):
-            all_failed_issues_with_notes = {}  # dictionary to accumulate failed issues with detailed notes
-
-            for path in saved_paths:
-                st.write(f"📁 Validating `{path}`...")
-                report = validate_document_http(path)
-
-                doc_type = report.get("document_type", None)
-                allowed_fields = []
-
-                # Add database_check field if Nursing License
-                if doc_type in ONBOARDING_CHECKLIST_TEMPLATE:
-                    allowed_fields = list(ONBOARDING_CHECKLIST_TEMPLATE[doc_type]["required_fields"].keys())
-                    if doc_type == "Nursing License":
-                        allowed_fields.append("database_check")  # To display DB verification
-
-                validation_results = report.get("validation", {})
-                extracted_info = report.get("extracted_info", {})
-
-                # Verify nursing license data against DB and update validation results
-                if doc_type == "Nursing License":
-                    is_valid, matched_record, mismatches = verify_nursing_license(extracted_info, nursing_license_db)
-                    if is_valid:
-                        validation_results["database_check"] = {
-                            "status": "PASS",
-                            "notes": "Nursing license data verified successfully against database."
-                        }
-                    else:
-                        notes = "Nursing license data does not match database records."
-                        if mismatches:
-                            notes += "\nMismatched fields:\n"
-                            for field, (extracted_val, db_val) in mismatches.items():
-                                notes += f"- {field}: extracted='{extracted_val}', db='{db_val}'\n"
-                        validation_results["database_check"] = {
-                            "status": "FAIL",
-                            "notes": notes
-                        }
-                    # Update report validation so UI shows DB check status
-                    report["validation"] = validation_results
-
-                # Collect failed issues with their notes for chatbot context
-                for key, result in validation_results.items():
-                    if result.get("status") != "PASS" and (allowed_fields is None or key in allowed_fields):
-                        all_failed_issues_with_notes[key] = result.get("notes", "No details provided.")
-
-                # Instead of rendering full report here, just show a brief status
-                if all(result.get("status") == "PASS" for result in validation_results.values()):
-                    st.success(f"✅ `{doc_type}` validated successfully.")
-                else:
-                    st.warning(f"⚠️ `{doc_type}` has validation issues. Please ask the chatbot for details.")
+            # Validation runs as persistent background jobs, so it survives reruns and reloads.
+            # Jobs are deduplicated on the report cache key, so a prompt or model change is not
+            # answered with an old job's result.
+            queue = get_job_queue()
+            job_ids = [
+                queue.enqueue(VALIDATION_JOB, {"path": path}, dedup_key=validation_cache_key(path))
+                for path in saved_paths
+            ]
+            batch_id = queue.create_batch(candidate_id, job_ids)
+            st.session_state.setdefault("validation_batches", {})[candidate_id] = batch_id
+            # Uploads are stored by content hash, so remember the names to show
+            st.session_state.setdefault("batch_file_names", {})[batch_id] = [file.name for file in uploaded_files]
 
-                if doc_type in checklist:
-                    checklist = update_checklist(checklist, doc_type, validation_results, notes=report.get("notes", ""))
+    else:
+        st.info("Please upload one or more documents to begin validation.")
 
-            # Save failed issues with notes in session state for chatbot to access
-            st.session_state.pending_validation_issues = all_failed_issues_with_notes
+    # Show the current (or, after a reload, the candidate's latest) validation batch
+    batches = st.session_state.setdefault("validation_batches", {})
+    if candidate_id not in batches:
+        batches[candidate_id] = get_job_queue().latest_batch(candidate_id)
+    batch_id = batches[candidate_id]
+    if batch_id:
+        show_validation_batch(candidate_id, batch_id)
 
-            # Show overall onboarding progress after validation
-            progress = calculate_onboarding_progress(checklist)
-            st.subheader("📊 Onboarding Progress")
-            st.progress(progress / 100)
-            st.write(f"Overall Completion: {progress}%")
 
-    else:
-        st.info("Please upload one or more documents to begin validation.")
+def show_validation_batch(candidate_id, batch_id):
+    """
+    Render a batch's job statuses, polling until all jobs finish, then apply the reports.
+
+    While jobs are pending only the poll_validation_batch fragment reruns, so the rest
+    of the page (chatbot, sidebar) stays usable. A finished batch is kept in the session
+    with its failed issues and progress, so later reruns render it without touching the
+    job queue or checklist database.
+    """
+    finished = st.session_state.setdefault("finished_batches", {})
+    if batch_id not in finished:
+        poll_validation_batch(candidate_id, batch_id)
+        return
+    outcome = finished[batch_id]
+
+    render_batch_jobs(batch_id, outcome["jobs"])
+
+    # Save failed issues with notes in session state for chatbot to access
+    st.session_state.pending_validation_issues = outcome["issues"]
+
+    # Show overall onboarding progress after validation
+    st.subheader("📊 Onboarding Progress")
+    st.progress(outcome["progress"] / 100)
+    st.write(f"Overall Completion: {outcome['progress']}%")
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_validation_batch(candidate_id, batch_id):
+    """Show a pending batch's job statuses; once every job finishes, apply the batch and rerun the page."""
+    jobs = get_job_queue().batch_jobs(batch_id)
+    if not jobs:
+        return
+    if all(job["status"] in FINISHED_STATUSES for job in jobs):
+        st.session_state.finished_batches[batch_id] = apply_batch(candidate_id, batch_id, jobs)
+        add_job_spans_to_trace(jobs)
+        # Full rerun, so the results, progress and chatbot context are rendered outside the fragment
+        st.rerun()
+    render_batch_jobs(batch_id, jobs)
+
+
+def render_batch_jobs(batch_id, jobs):
+    """Show each job of a batch: its status while pending, then its validation outcome."""
+    st.write(f"📁 Validating {len(jobs)} document(s)...")
+    names = st.session_state.get("batch_file_names", {}).get(batch_id) or [job["payload"]["path"] for job in jobs]
+    for job, path in zip(jobs, names):
+        if job["status"] not in FINISHED_STATUSES:
+            retry_note = f" (attempt {job['attempts']})" if job["attempts"] > 1 else ""
+            st.info(f"⏳ `{path}` is {job['status']}{retry_note}...")
+            continue
+
+        report = job_report(job)
+        doc_type = report.get("document_type", None)
+        validation_results = report.get("validation", {})
+
+        if "error" in report:
+            st.error(f"❌ `{path}` could not be validated: {report['error']}")
+        elif all(result.get("status") == "PASS" for result in validation_results.values()):
+            st.success(f"✅ `{doc_type}` (`{path}`) validated successfully.")
+        else:
+            st.warning(f"⚠️ `{doc_type}` (`{path}`) has validation issues. Please ask the chatbot for details.")
+
+        preprocessing = report.get("preprocessing")
+        if preprocessing:
+            st.caption(
+                f"Image optimized: {preprocessing['bytes_saved'] / 1024:.0f} KB smaller "
+                f"(estimated net latency saved: {preprocessing['latency_saved_ms']:.0f} ms)."
+            )
+
+
+def add_job_spans_to_trace(jobs):
+    """
+    Add the stage spans recorded by the workers that ran jobs to this session's trace.
+
+    Jobs whose result was reused from an earlier identical submission contribute
+    the timings of that original run.
+    """
+    trace = st.session_state.get("trace")
+    if trace is None:
+        return
+    for job in jobs:
+        for record in (job["result"] or {}).get("stage_spans", []):
+            trace.add(record)
+
+
+def job_report(job):
+    """The validation report of a finished job."""
+    return job["result"] or {"error": job["error"] or "Validation failed."}
+
+
+def apply_batch(candidate_id, batch_id, jobs):
+    """
+    Collect failed issues from a finished batch and apply its reports to the candidate's checklist.
+
+    Reports are applied in upload order so the checklist does not depend on completion
+    order, and only once per batch even if several sessions show it.
+
+    Returns:
+        dict: 'jobs', 'issues' (failed field -> notes) and 'progress' (percent).
+    """
+    apply_to_checklist = get_job_queue().mark_batch_applied(batch_id)
+    checklist = load_checklist(candidate_id)
+    all_failed_issues_with_notes = {}  # dictionary to accumulate failed issues with detailed notes
+    for job in jobs:
+        report = job_report(job)
+        doc_type = report.get("document_type", None)
+        allowed_fields = []
+
+        # Add database_check field if Nursing License
+        if doc_type in ONBOARDING_CHECKLIST_TEMPLATE:
+            allowed_fields = list(ONBOARDING_CHECKLIST_TEMPLATE[doc_type]["required_fields"].keys())
+            if doc_type == "Nursing License":
+                allowed_fields.append("database_check")  # To display DB verification
+
+        validation_results = report.get("validation", {})
+
+        # Collect failed issues with their notes for chatbot context
+        for key, result in validation_results.items():
+            if result.get("status") != "PASS" and (allowed_fields is None or key in allowed_fields):
+                all_failed_issues_with_notes[key] = result.get("notes", "No details provided.")
+
+        if apply_to_checklist and doc_type in checklist:
+            checklist = update_candidate_checklist(
+                candidate_id, doc_type, validation_results, notes=report.get("notes", "")
+            )
+
+    return {
+        "jobs": jobs,
+        "issues": all_failed_issues_with_notes,
+        "progress": calculate_onboarding_progress(checklist),
+    }
 
 
 def chatbot_panel():
@@ -135,13 +270,13 @@ def chatbot_panel():
     }
 
     # Initialize session state
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+    if "chat_context" not in st.session_state:
+        st.session_state.chat_context = ChatContextManager(get_session_id())
     if "pending_validation_issues" not in st.session_state:
         st.session_state.pending_validation_issues = {}
 
     # Display chat history
-    for message in st.session_state.chat_history:
+    for message in st.session_state.chat_context.history:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
@@ -151,19 +286,31 @@ def chatbot_panel():
     if user_input:
         with st.chat_message("user"):
             st.markdown(user_input)
-        st.session_state.chat_history.append({"role": "user", "content": user_input})
+        st.session_state.chat_context.append("user", user_input)
 
-        # Build detailed context notes from validation issues
-        issues = st.session_state.pending_validation_issues
+        # Build detailed context notes from the validation issues, or the most relevant ones if there are many
+        pending_issues = st.session_state.pending_validation_issues
+        issues = rank_issues(user_input, pending_issues)
         if issues:
             context_lines = []
             for key, note in issues.items():
                 friendly_desc = ISSUE_DESCRIPTIONS.get(key, key.replace("_", " ").capitalize())
                 context_lines.append(f"- {friendly_desc}: {note}")
+            omitted = len(pending_issues) - len(issues)
+            if omitted:
+                context_lines.append(
+                    f"- {omitted} other, less related issue(s) are not listed; if asked about all issues, "
+                    "say there are more and suggest asking about a specific field or document."
+                )
             context_notes = "\n".join(context_lines)
         else:
             context_notes = "There are no known validation issues right now."
 
+        # Add the knowledge base and HR policy passages most relevant to the question
+        passages = get_shared_resources()["kb_retriever"].search(user_input)
+        if passages:
+            context_notes += "\nRelevant knowledge base and HR policy information:\n" + "\n".join(f"- {p}" for p in passages)
+
         # System prompt with escalation instructions
         system_prompt = (
             "You are a helpful and friendly onboarding assistant chatbot. "
@@ -187,65 +334,52 @@ def chatbot_panel():
             "display the JSON object to the user in the chat UI; it is also for backend processing"
         )
 
-        messages = [
-            {
-                "role": "system",
-                "content": system_prompt
-            }
-        ] + st.session_state.chat_history[-6:]
+        # System prompt, summary of older turns and as much recent history as fits the token budget
+        messages = st.session_state.chat_context.build_messages(system_prompt)
 
-        # Call Groq API and process response
-        try:
-            groq_key = os.getenv("GROQ_API_KEY")
-            res = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {groq_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama3-8b-8192",
-                    "messages": messages,
-                    "temperature": 0.7
-                }
-            )
-            full_response = res.json()["choices"][0]["message"]["content"]
-
-            # Extract JSON escalation block
-            json_match = re.search(r"```json(.*?)```", full_response, re.DOTALL)
-            escalation_data = None
-            if json_match:
-                json_text = json_match.group(1).strip()
-                try:
-                    escalation_json = json.loads(json_text)
-                    escalation_data = escalation_json.get("escalation")
-                except json.JSONDecodeError:
-                    escalation_data = None
-                
-                user_friendly_response = re.sub(r"```json.*?```", "", full_response, flags=re.DOTALL).strip()
-            else:
-                user_friendly_response = full_response
-             
-            # Save escalation if present
-            if escalation_data:
-                print("Escalation data found:", escalation_data)
-                if "date" not in escalation_data or not escalation_data["date"]:
-                    escalation_data["date"] = datetime.now().strftime("%Y-%m-%d")
-                print("📤 About to call save_escalation with:", escalation_data)    
-                save_escalation(
-                    employee_name=escalation_data.get("name", "Unknown"),
-                    issue_description=escalation_data.get("issue", "No description provided."),
-                    date=escalation_data.get("date")
+        # Stream the Groq response into the assistant message as tokens arrive
+        timings = {}
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            try:
+                full_response = ""
+                for fragment in stream_groq_chat(messages, model="llama3-8b-8192", temperature=0.7, timings=timings):
+                    full_response += fragment
+                    placeholder.markdown(full_response + "▌")
+
+                # Extract JSON escalation block
+                json_match = re.search(r"```json(.*?)```", full_response, re.DOTALL)
+                escalation_data = None
+                if json_match:
+                    json_text = json_match.group(1).strip()
+                    try:
+                        escalation_json = json.loads(json_text)
+                        escalation_data = escalation_json.get("escalation")
+                    except json.JSONDecodeError:
+                        escalation_data = None
+
+                    user_friendly_response = re.sub(r"```json.*?```", "", full_response, flags=re.DOTALL).strip()
+                else:
+                    user_friendly_response = full_response
+
+                # Save escalation if present
+                if escalation_data:
+                    if "date" not in escalation_data or not escalation_data["date"]:
+                        escalation_data["date"] = datetime.now().strftime("%Y-%m-%d")
+                    save_escalation(
+                        employee_name=escalation_data.get("name", "Unknown"),
+                        issue_description=escalation_data.get("issue", "No description provided."),
+                        date=escalation_data.get("date")
+                    )
+
+            except Exception as e:
+                user_friendly_response = (
+                    f"⚠️ Sorry, something went wrong when contacting the assistant API.\n\n"
+                    f"Error details: `{e}`"
                 )
 
-        except Exception as e:
-            user_friendly_response = (
-                f"⚠️ Sorry, something went wrong when contacting the assistant API.\n\n"
-                f"Error details: `{e}`"
-            )
-
-        with st.chat_message("assistant"):
-            st.markdown(user_friendly_response)
-        st.session_state.chat_history.append({"role": "assistant", "content": user_friendly_response})
+            placeholder.markdown(user_friendly_response)
+        st.session_state.chat_context.append("assistant", user_friendly_response)
 
-chatbot_panel()
\ No newline at end of file
+        # Keep recent response latencies (time to first token, total) for this session
+        st.session_state.chat_timings = (st.session_state.get("chat_timings", []) + [timings])[-50:]
@@ -1,34 +1,24 @@
 import os
-import base64
+import io
 import requests
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import pypdfium2 as pdfium
 from dotenv import load_dotenv
+from app.http_client import Base64JSONBody, get_http_client
+from app.report_cache import document_cache_key, get_report_cache
+from app.image_preprocess import optimize_image, preprocess_image, preprocess_settings
+from app.onboarding_checklist import DOCUMENT_FIELD_MAPPING
+from app.metrics import record, span, submit_with_context
+from app.text_extract import PDFIUM_LOCK, TEXT_EXTRACTION_VERSION, extract_text_report
 
 load_dotenv()
 
-def validate_document_http(file_path: str) -> dict:
-    api_key = os.getenv("AZURE_OPENAI_API_KEY")
-    endpoint = os.getenv("AZURE_OPENAI_API_BASE")
-    deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-    api_version = os.getenv("AZURE_OPENAI_API_VERSION")
+VALIDATION_SYSTEM_PROMPT = "You are a helpful assistant that validates scanned onboarding documents."
 
-    if not all([api_key, endpoint, deployment_name, api_version]):
-        return {"error": "Missing one or more environment variables."}
-
-    url = f"{endpoint}/openai/deployments/{deployment_name}/chat/completions?api-version={api_version}"
-
-    file_path = Path(file_path)
-    if not file_path.exists():
-        return {"error": f"File not found: {file_path}"}
-
-    with open(file_path, "rb") as f:
-        image_bytes = f.read()
-
-    base64_image = base64.b64encode(image_bytes).decode()
-
-    prompt = (
-    """You are an assistant that analyzes scanned onboarding documents.
+VALIDATION_PROMPT = """You are an assistant that analyzes scanned onboarding documents.
 
 Step 1: Identify the type of document. Examples include: Employment Contract, Nursing License, etc.
 
@@ -58,9 +48,27 @@ Please respond in the following JSON format:
   "notes": "Any additional observations"
 }"""
 
+# Bump when report post-processing changes so cached reports are not reused
+REPORT_FORMAT_VERSION = 3
+
+# PDF pages are rasterized at this resolution and validated this many at a time
+PDF_RENDER_DPI = int(os.getenv("PDF_RENDER_DPI", "150"))
+PDF_PAGE_CONCURRENCY = int(os.getenv("PDF_PAGE_CONCURRENCY", "2"))
+
+# pdfium is not thread-safe; rendering shares the text extractor's lock
+_pdfium_lock = PDFIUM_LOCK
 
-)
+_BASE64_PLACEHOLDER = "@@BASE64_IMAGE@@"
 
+def _request_validation(url, api_key, image_source, image_size, mime_type):
+    """
+    Send one image to the vision model and return its parsed validation report.
+
+    Args:
+        image_source: Binary file-like object positioned at the start of the image.
+        image_size (int): Number of bytes to send from image_source.
+        mime_type (str): MIME type for the data URL.
+    """
     headers = {
         "api-key": api_key,
         "Content-Type": "application/json"
@@ -73,7 +81,7 @@ Please respond in the following JSON format:
                 "content": [
                     {
                         "type": "text",
-                        "text": "You are a helpful assistant that validates scanned onboarding documents."
+                        "text": VALIDATION_SYSTEM_PROMPT
                     }
                 ]
             },
@@ -82,12 +90,12 @@ Please respond in the following JSON format:
                 "content": [
                     {
                         "type": "text",
-                        "text": prompt
+                        "text": VALIDATION_PROMPT
                     },
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
+                            "url": f"data:{mime_type};base64,{_BASE64_PLACEHOLDER}"
                         }
                     }
                 ]
@@ -97,24 +105,239 @@ Please respond in the following JSON format:
         "max_tokens": 1000
     }
 
-    response = requests.post(url, headers=headers, json=json_data)
+    # The image is base64-encoded into the body as it is sent, not held in memory
+    body = Base64JSONBody(json_data, _BASE64_PLACEHOLDER, image_source, image_size)
+
+    try:
+        with span("azure_request") as request_span:
+            response = get_http_client().post("azure", url, headers=headers, data=body)
+            request_span.add_bytes(sent=len(body), received=len(response.content))
+            if response.status_code != 200:
+                request_span.fail()
+    except requests.RequestException as e:
+        return {"error": f"Request failed: {e}"}
+    finally:
+        # Encoding happens while the body streams out, so it is also part of azure_request
+        record("base64_encode", body.encode_seconds)
 
     if response.status_code == 200:
         try:
-            content = response.json()["choices"][0]["message"]["content"]
+            with span("parse_response"):
+                return _parse_report(response)
+        except json.JSONDecodeError as e:
+            return {"error": "Failed to parse JSON from AI response.", "raw_response": e.doc}
+    else:
+        return {"error": f"Request failed with status {response.status_code}", "details": response.text}
+
+
+def _parse_report(response):
+    """Extract the JSON report from a chat-completions response, stripping markdown code fences."""
+    content = response.json()["choices"][0]["message"]["content"]
+
+    # Strip markdown code fences if present
+    if content.startswith("```json"):
+        content = content[len("```json"):]
+
+    if content.endswith("```"):
+        content = content[:-3]
+
+    content = content.strip()
+
+    return json.loads(content)
+
+
+def required_fields_for(document_type):
+    """Fields the vision model must PASS for a document type (the database check is added later)."""
+    return [field for field in DOCUMENT_FIELD_MAPPING.get(document_type, []) if field != "database_check"]
+
+
+def merge_page_reports(page_reports):
+    """
+    Merge per-page validation reports of one document into a single report.
+
+    The document type is the most common recognised type across pages. A field
+    passes if it passed on any page, and its extracted value is taken from a page
+    where it passed, falling back to the first page that extracted it.
+
+    Args:
+        page_reports (list): (page_number, report) tuples in page order.
+
+    Returns:
+        dict: Merged report in the same format as a single-image report. If some
+              (but not all) pages failed, "page_errors" maps their page numbers
+              to the errors, marking the report as partial.
+    """
+    valid_pages = [(page, report) for page, report in page_reports if "error" not in report]
+    if not valid_pages:
+        return page_reports[0][1] if page_reports else {"error": "PDF has no pages."}
+
+    detected_types = [report.get("document_type") for _, report in valid_pages]
+    known_types = [doc_type for doc_type in detected_types if doc_type in DOCUMENT_FIELD_MAPPING]
+    document_type = Counter(known_types or detected_types).most_common(1)[0][0]
 
-            # Strip markdown code fences if present
-            if content.startswith("```json"):
-                content = content[len("```json"):]
+    validation = {}
+    extracted_info = {}
+    notes = []
+    for page, report in valid_pages:
+        page_extracted = report.get("extracted_info") or {}
+        for field, result in (report.get("validation") or {}).items():
+            passed = result.get("status") == "PASS"
+            if field not in validation or (passed and validation[field].get("status") != "PASS"):
+                validation[field] = result
+                if passed and page_extracted.get(field):
+                    extracted_info[field] = page_extracted[field]
+        for field, value in page_extracted.items():
+            if value and field not in extracted_info:
+                extracted_info[field] = value
+        if report.get("notes"):
+            notes.append(f"Page {page}: {report['notes']}")
 
-            if content.endswith("```"):
-                content = content[:-3]
+    merged = {
+        "document_type": document_type,
+        "validation": validation,
+        "extracted_info": extracted_info,
+        "notes": "\n".join(notes),
+    }
+    page_errors = {page: report["error"] for page, report in page_reports if "error" in report}
+    if page_errors:
+        merged["page_errors"] = page_errors
+    return merged
+
+
+def _is_complete(report):
+    """True once every required field of the report's document type has passed."""
+    required = required_fields_for(report.get("document_type"))
+    validation = report.get("validation") or {}
+    return bool(required) and all(validation.get(field, {}).get("status") == "PASS" for field in required)
+
+
+def _render_pdf_page(pdf, index):
+    """Rasterize one PDF page and encode it for the vision model."""
+    with span("pdf_render"):
+        with _pdfium_lock:
+            page = pdf[index]
+            try:
+                image = page.render(scale=PDF_RENDER_DPI / 72).to_pil()
+            finally:
+                page.close()
+        _, image_bytes, mime_type = optimize_image(image)
+    return image_bytes, mime_type
+
+
+def _merge_with_local(local_report, page_reports):
+    """Merge page reports, counting fields resolved from the text layer once any page succeeded."""
+    if local_report is None or all("error" in report for _, report in page_reports):
+        return merge_page_reports(page_reports)
+    return merge_page_reports([(0, local_report)] + page_reports)
+
+
+def _validate_pdf(url, api_key, file_path, local_report=None):
+    """
+    Validate a PDF page by page.
+
+    Pages are rasterized and submitted PDF_PAGE_CONCURRENCY at a time, and no
+    further pages are sent once the merged report has every required field passing.
+    Fields in local_report (resolved from the text layer) count as passing.
+    """
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(str(file_path))
+        page_count = len(pdf)
 
-            content = content.strip()
+    try:
+        page_reports = []
+        merged = merge_page_reports(page_reports)
+        with ThreadPoolExecutor(max_workers=max(1, PDF_PAGE_CONCURRENCY)) as executor:
+            for wave_start in range(0, page_count, max(1, PDF_PAGE_CONCURRENCY)):
+                wave = range(wave_start, min(page_count, wave_start + max(1, PDF_PAGE_CONCURRENCY)))
+                futures = []
+                for index in wave:
+                    image_bytes, mime_type = _render_pdf_page(pdf, index)
+                    futures.append((index + 1, submit_with_context(
+                        executor, _request_validation, url, api_key, io.BytesIO(image_bytes), len(image_bytes), mime_type
+                    )))
+                page_reports.extend((page, future.result()) for page, future in futures)
 
-            parsed = json.loads(content)
-            return parsed
-        except json.JSONDecodeError:
-            return {"error": "Failed to parse JSON from AI response.", "raw_response": content}
+                merged = _merge_with_local(local_report, page_reports)
+                if _is_complete(merged):
+                    break
+    finally:
+        with _pdfium_lock:
+            pdf.close()
+
+    if "error" not in merged:
+        merged["pages_processed"] = len(page_reports)
+        merged["page_count"] = page_count
+        if local_report is not None:
+            merged["extraction"] = local_report["extraction"]
+    return merged
+
+
+def validation_cache_key(file_path) -> str:
+    """
+    Key identifying the report for file_path: its content plus the prompt, model,
+    report format and preprocessing settings that shape the report.
+    """
+    return document_cache_key(
+        file_path, VALIDATION_SYSTEM_PROMPT, VALIDATION_PROMPT, os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        os.getenv("AZURE_OPENAI_API_VERSION"), REPORT_FORMAT_VERSION, preprocess_settings(), PDF_RENDER_DPI,
+        TEXT_EXTRACTION_VERSION,
+    )
+
+
+def validate_document_http(file_path: str) -> dict:
+    file_path = Path(file_path)
+    if not file_path.exists():
+        return {"error": f"File not found: {file_path}"}
+
+    with open(file_path, "rb") as f:
+        is_pdf = f.read(5) == b"%PDF-"
+
+    # Born-digital PDFs: read fields from the text layer and skip the model when all resolve
+    local_report = None
+    if is_pdf:
+        with span("text_extract"):
+            local_report, unresolved = extract_text_report(file_path)
+        if local_report is not None and not unresolved:
+            return local_report
+
+    api_key = os.getenv("AZURE_OPENAI_API_KEY")
+    endpoint = os.getenv("AZURE_OPENAI_API_BASE")
+    deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+    api_version = os.getenv("AZURE_OPENAI_API_VERSION")
+
+    if not all([api_key, endpoint, deployment_name, api_version]):
+        return {"error": "Missing one or more environment variables."}
+
+    url = f"{endpoint}/openai/deployments/{deployment_name}/chat/completions?api-version={api_version}"
+
+    # Identical bytes validated with the same prompt and model reuse the stored report
+    cache = get_report_cache()
+    cache_key = validation_cache_key(file_path)
+    cached_report = cache.get(cache_key)
+    if cached_report is not None:
+        # No preprocessing happened for a cache hit (older entries stored the original run's stats)
+        cached_report.pop("preprocessing", None)
+        return cached_report
+
+    if is_pdf:
+        try:
+            report = _validate_pdf(url, api_key, file_path, local_report)
+        except pdfium.PdfiumError as e:
+            return {"error": f"Could not read PDF: {e}"}
     else:
-        return {"error": f"Request failed with status {response.status_code}", "details": response.text}
+        # Orient, crop and downsample before upload; non-images are sent unchanged
+        with span("preprocess"):
+            image_bytes, mime_type, preprocessing_stats = preprocess_image(file_path)
+        if image_bytes is None:
+            with open(file_path, "rb") as f:
+                report = _request_validation(url, api_key, f, os.fstat(f.fileno()).st_size, mime_type or "image/jpeg")
+        else:
+            report = _request_validation(url, api_key, io.BytesIO(image_bytes), len(image_bytes), mime_type)
+        if preprocessing_stats and "error" not in report:
+            report["preprocessing"] = preprocessing_stats
+
+    # Partial reports (some PDF pages failed) are returned but not cached, so a retry can do better
+    # Preprocessing stats describe this run only, so they are not cached
+    if "error" not in report and not report.get("page_errors"):
+        cache.put(cache_key, {key: value for key, value in report.items() if key != "preprocessing"})
+    return report
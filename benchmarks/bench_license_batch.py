@@ -0,0 +1,43 @@
+"""
+Throughput of verify_nursing_licenses_batch against calling verify_nursing_license in a loop.
+
+Usage:
+    python -m benchmarks.bench_license_batch --records 100000 --docs 2000
+"""
+
+import argparse
+import time
+
+from app.db_utils import NursingLicenseRegistry, verify_nursing_license, verify_nursing_licenses_batch
+from benchmarks.synthetic import make_extracted_infos, make_license_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000, help="Synthetic registry size")
+    parser.add_argument("--docs", type=int, default=2_000, help="Documents per batch")
+    parser.add_argument("--typo-rate", type=float, default=0.1, help="Share of documents that miss exact matching")
+    args = parser.parse_args()
+
+    records = make_license_records(args.records)
+    registry = NursingLicenseRegistry(records)
+    infos = make_extracted_infos(records, args.docs, typo_rate=args.typo_rate)
+
+    start = time.perf_counter()
+    scalar_results = [verify_nursing_license(info, registry) for info in infos]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_results = verify_nursing_licenses_batch(infos, registry)
+    batch_time = time.perf_counter() - start
+
+    assert batch_results == scalar_results, "batch and scalar verification disagree"
+
+    print(f"registry={args.records} docs={args.docs} typo_rate={args.typo_rate}")
+    print(f"scalar loop: {scalar_time:.3f}s  ({args.docs / scalar_time:,.0f} docs/s)")
+    print(f"batch:       {batch_time:.3f}s  ({args.docs / batch_time:,.0f} docs/s)")
+    print(f"speedup:     {scalar_time / batch_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
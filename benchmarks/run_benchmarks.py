@@ -0,0 +1,193 @@
+"""
+Offline micro-benchmarks for the onboarding hot paths.
+
+Writes machine-readable results and compares them against a stored baseline;
+exits with status 1 if any benchmark regressed by more than the threshold.
+
+Usage:
+    python -m benchmarks.run_benchmarks                      # full sweep, registry up to 1M records
+    python -m benchmarks.run_benchmarks --max-records 100000 # shorter sweep
+    python -m benchmarks.run_benchmarks --save-baseline      # store these results as the new baseline
+"""
+
+import argparse
+import copy
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.chatbot import get_kb_entries_for_issues
+from app.db_utils import NursingLicenseRegistry, normalize_date, normalize_str, verify_nursing_license
+from app.http_client import Base64JSONBody
+from app.kb_store import ValidationKBStore
+from app.onboarding_checklist import ONBOARDING_CHECKLIST_TEMPLATE, calculate_onboarding_progress, update_checklist
+from benchmarks.synthetic import make_extracted_infos, make_license_records
+
+BENCHMARK_DIR = Path(__file__).parent
+DEFAULT_OUTPUT = BENCHMARK_DIR / "results.json"
+DEFAULT_BASELINE = BENCHMARK_DIR / "baseline.json"
+REGISTRY_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def measure(fn, min_time=0.5, min_runs=5, batch=1):
+    """
+    Time fn repeatedly for at least min_time seconds and min_runs runs.
+
+    batch is the number of operations one call of fn performs, so results are per operation.
+    """
+    fn()  # warm up
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < min_runs or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) / batch)
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "mean_us": round(mean * 1e6, 3),
+        "p50_us": round(samples[len(samples) // 2] * 1e6, 3),
+        "p95_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1e6, 3),
+        "ops_per_sec": round(1 / mean, 1) if mean else None,
+        "runs": len(samples),
+    }
+
+
+def bench_license_verification(results, max_records):
+    for size in [n for n in REGISTRY_SIZES if n <= max_records]:
+        records = make_license_records(size)
+        start = time.perf_counter()
+        registry = NursingLicenseRegistry(records)
+        results[f"registry_build[{size}]"] = {"mean_us": round((time.perf_counter() - start) * 1e6, 3), "runs": 1}
+
+        exact = make_extracted_infos(records, 200, typo_rate=0.0)
+        typos = make_extracted_infos(records, 200, typo_rate=1.0, seed=2)
+        results[f"verify_nursing_license_exact[{size}]"] = measure(
+            lambda: [verify_nursing_license(info, registry) for info in exact], batch=len(exact)
+        )
+        results[f"verify_nursing_license_closest[{size}]"] = measure(
+            lambda: [verify_nursing_license(info, registry) for info in typos], batch=len(typos)
+        )
+        del registry, records
+
+
+def bench_normalizers(results):
+    names = ["Sujata Sharma", "  MARIA  o'Neil-Garcia ", "Dr. Priya K. Rai", ""]
+    dates = ["1993-08-20", "20/08/1993", "08/31/1993", "not a date"]
+    results["normalize_str"] = measure(lambda: [normalize_str(name) for name in names], batch=len(names))
+    results["normalize_date"] = measure(lambda: [normalize_date(date) for date in dates], batch=len(dates))
+
+
+def bench_kb_lookup(results):
+    codes = [f"issue_{i}" for i in range(200)]
+    kb = [
+        {"issue_code": code, "title": code, "description": "...", "possible_causes": [], "recommended_actions": []}
+        for code in codes
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        kb_path = Path(tmp) / "validation_kb.json"
+        kb_path.write_text(json.dumps(kb), encoding="utf-8")
+        store = ValidationKBStore(kb_path)
+        query = ["issue_3", "issue_150", "missing", "issue_42"]
+        results["kb_lookup_store"] = measure(lambda: get_kb_entries_for_issues(store, query))
+        results["kb_lookup_list"] = measure(lambda: get_kb_entries_for_issues(kb, query))
+
+
+def bench_checklist(results):
+    validation = {
+        field: {"status": "PASS" if i % 3 else "FAIL", "notes": "ok"}
+        for i, field in enumerate(ONBOARDING_CHECKLIST_TEMPLATE["Nursing License"]["required_fields"])
+    }
+    results["update_checklist"] = measure(
+        lambda: update_checklist(copy.deepcopy(ONBOARDING_CHECKLIST_TEMPLATE), "Nursing License", validation, notes="n")
+    )
+    checklist = update_checklist(copy.deepcopy(ONBOARDING_CHECKLIST_TEMPLATE), "Nursing License", validation)
+    results["calculate_onboarding_progress"] = measure(lambda: calculate_onboarding_progress(checklist))
+
+
+def bench_payload(results):
+    image = bytes(range(256)) * (4 * 1024 * 4)  # 4 MB
+    payload = {"messages": [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,@@B64@@"}}]}]}
+
+    def build_and_drain():
+        body = Base64JSONBody(payload, "@@B64@@", io.BytesIO(image), len(image))
+        while body.read(64 * 1024):
+            pass
+
+    results["base64_payload_4mb"] = measure(build_and_drain)
+
+
+def compare(results, baseline, threshold):
+    """
+    Return (name, baseline_us, current_us, change) for benchmarks slower than baseline by more than threshold.
+    Single-shot timings (e.g. registry builds) are reported but too noisy to gate on.
+    """
+    regressions = []
+    for name, current in results.items():
+        if current.get("runs", 0) < 5:
+            continue
+        previous = baseline.get(name)
+        if not previous or not previous.get("mean_us"):
+            continue
+        change = current["mean_us"] / previous["mean_us"] - 1
+        if change > threshold:
+            regressions.append((name, previous["mean_us"], current["mean_us"], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-records", type=int, default=REGISTRY_SIZES[-1], help="Largest registry size in the sweep")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where to write results JSON")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results to --baseline")
+    args = parser.parse_args()
+
+    results = {}
+    bench_normalizers(results)
+    bench_kb_lookup(results)
+    bench_checklist(results)
+    bench_payload(results)
+    bench_license_verification(results, args.max_records)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    for name, result in results.items():
+        print(f"{name:45s} {result['mean_us']:>14,.1f} us")
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline to store one.")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {before:,.1f} us -> {after:,.1f} us (+{change:.0%})")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
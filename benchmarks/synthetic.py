@@ -0,0 +1,53 @@
+"""Synthetic nursing license data for offline benchmarks."""
+
+import random
+
+FIRST_NAMES = [
+    "Sujata", "Anita", "Maria", "Priya", "Rita", "Sarah", "Grace", "Kamala", "Sita", "Laxmi",
+    "Emily", "Olivia", "Aisha", "Fatima", "Mei", "Yuki", "Ana", "Elena", "Nora", "Ruth",
+]
+LAST_NAMES = [
+    "Sharma", "Thapa", "Smith", "Gurung", "Rai", "Karki", "Shrestha", "Adhikari", "Tamang", "Magar",
+    "Johnson", "Garcia", "Khan", "Chen", "Tanaka", "Silva", "Novak", "Okafor", "Murphy", "Ivanova",
+]
+FIELDS_OF_PRACTICE = ["MIDWIFE", "NURSE", "REGISTERED NURSE", "AUXILIARY NURSE MIDWIFE"]
+
+
+def make_license_records(n, seed=0):
+    """Generate n registry records shaped like nursing_license_db.json."""
+    rng = random.Random(seed)
+    return [
+        {
+            "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "date_of_birth": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1960, 2004)}",
+            "license_number": str(10000 + idx),
+            "gender": rng.choice("FM"),
+            "valid_until": f"30/06/{rng.randint(2025, 2035)}",
+            "field_of_practice": rng.choice(FIELDS_OF_PRACTICE),
+        }
+        for idx in range(n)
+    ]
+
+
+def make_extracted_infos(records, n, typo_rate=0.5, seed=1):
+    """
+    Generate n extracted_info dicts for records, as the vision model would return them.
+    A typo_rate share of them carry an OCR-style typo in the name so they miss exact matching.
+    """
+    rng = random.Random(seed)
+    infos = []
+    for _ in range(n):
+        record = rng.choice(records)
+        name = record["full_name"]
+        if rng.random() < typo_rate:
+            pos = rng.randrange(len(name))
+            name = name[:pos] + rng.choice("aeiou") + name[pos + 1:]
+        infos.append({
+            "name": name,
+            "date_of_birth": record["date_of_birth"],
+            "license_number": record["license_number"],
+            "gender": record["gender"],
+            "valid_until": record["valid_until"],
+            "to_practice_as": record["field_of_practice"].title(),
+        })
+    return infos
@@ -0,0 +1,238 @@
+"""
+End-to-end load test: N concurrent candidates through upload -> validate -> DB check
+-> checklist -> chat, against the local Azure/Groq stand-ins in mock_llm_server.py.
+
+Reports p50/p95/p99 latency and throughput per stage. All files the app writes
+(uploads, report cache, checklist database) go to a temporary working directory.
+
+Usage:
+    python -m loadtest.load_driver --candidates 50 --concurrency 10
+    python -m loadtest.load_driver --latency-ms 1500 --rate-limit-rate 0.1 --error-rate 0.02
+    python -m loadtest.load_driver --base-url http://127.0.0.1:8900   # use an already running mock server
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from loadtest.mock_llm_server import MockConfig, start_mock_server
+
+STAGES = ["upload", "validate", "db_check", "checklist", "chat_ttft", "chat", "candidate_total"]
+
+
+class FakeUpload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile (name, size, file-like)."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+class StageRecorder:
+    """Thread-safe per-stage latency samples and error counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {stage: [] for stage in STAGES}
+        self.errors = {stage: 0 for stage in STAGES}
+
+    def record(self, stage, seconds, ok=True):
+        with self._lock:
+            self.samples[stage].append(seconds)
+            if not ok:
+                self.errors[stage] += 1
+
+    def summary(self, wall_seconds):
+        rows = {}
+        for stage in STAGES:
+            samples = sorted(self.samples[stage])
+            if not samples:
+                continue
+            rows[stage] = {
+                "count": len(samples),
+                "errors": self.errors[stage],
+                "p50_ms": round(percentile(samples, 50) * 1000, 1),
+                "p95_ms": round(percentile(samples, 95) * 1000, 1),
+                "p99_ms": round(percentile(samples, 99) * 1000, 1),
+                "max_ms": round(samples[-1] * 1000, 1),
+                "throughput_per_sec": round(len(samples) / wall_seconds, 2) if wall_seconds else None,
+            }
+        return rows
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(0, min(len(sorted_samples) - 1, int(round(pct / 100 * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[rank]
+
+
+def make_document_image(seed, width=1600, height=1100):
+    """Render a synthetic license-like JPEG whose bytes differ per seed."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (245, 245, 240))
+    draw = ImageDraw.Draw(image)
+    for row in range(12):
+        y = 120 + row * 70
+        draw.rectangle([100, y, 100 + rng.randint(400, 1300), y + 28], fill=(30, 30, 60))
+    draw.text((100, 40), f"NURSING LICENSE {seed}", fill=(0, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def run_candidate(candidate_id, documents, registry, recorder):
+    """Take one candidate through the whole onboarding flow, recording each stage."""
+    from app.chat_context import ChatContextManager
+    from app.chatbot import GROQ_SYSTEM_PROMPT, stream_groq_chat
+    from app.checklist_state_manager import update_candidate_checklist
+    from app.handlers import save_uploaded_files
+    from app.onboarding_checklist import ONBOARDING_CHECKLIST_TEMPLATE
+    from app.pipeline import database_check_result
+    from app.validator import validate_document_http
+
+    candidate_start = time.perf_counter()
+    start = time.perf_counter()
+    uploads = [FakeUpload(f"{candidate_id}_{i}.jpg", data) for i, data in enumerate(documents)]
+    paths = save_uploaded_files(uploads, candidate_id)
+    recorder.record("upload", time.perf_counter() - start)
+
+    failed_fields = []
+    for path in paths:
+        start = time.perf_counter()
+        report = validate_document_http(path)
+        recorder.record("validate", time.perf_counter() - start, "error" not in report)
+        if "error" in report:
+            continue
+
+        validation = report.get("validation", {})
+        if report.get("document_type") == "Nursing License":
+            start = time.perf_counter()
+            validation["database_check"] = database_check_result(report.get("extracted_info", {}), registry)
+            recorder.record("db_check", time.perf_counter() - start)
+
+        if report.get("document_type") in ONBOARDING_CHECKLIST_TEMPLATE:
+            start = time.perf_counter()
+            update_candidate_checklist(candidate_id, report.get("document_type"), validation, report.get("notes"))
+            recorder.record("checklist", time.perf_counter() - start)
+        failed_fields += [field for field, result in validation.items() if result.get("status") == "FAIL"]
+
+    context = ChatContextManager(candidate_id)
+    context.append("user", f"Why did these fields fail: {', '.join(failed_fields) or 'none'}?")
+    timings = {}
+    start = time.perf_counter()
+    ok = True
+    try:
+        reply = "".join(stream_groq_chat(context.build_messages(GROQ_SYSTEM_PROMPT), timings=timings))
+        context.append("assistant", reply)
+    except Exception:
+        ok = False
+    recorder.record("chat", time.perf_counter() - start, ok)
+    if "ttft_ms" in timings:
+        recorder.record("chat_ttft", timings["ttft_ms"] / 1000)
+    recorder.record("candidate_total", time.perf_counter() - candidate_start, ok)
+
+
+def configure_environment(base_url, workdir):
+    """Point the app at the mock endpoints and at a throwaway working directory."""
+    os.environ.update({
+        "AZURE_OPENAI_API_KEY": "loadtest",
+        "AZURE_OPENAI_API_BASE": base_url,
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "loadtest",
+        "AZURE_OPENAI_API_VERSION": "2024-02-15-preview",
+        "GROQ_API_KEY": "loadtest",
+        "GROQ_API_BASE": f"{base_url}/openai/v1",
+    })
+    os.environ.setdefault("CHECKLIST_DB_PATH", str(Path(workdir) / "checklists.db"))
+    os.environ.setdefault("REPORT_CACHE_DIR", str(Path(workdir) / "cache" / "reports"))
+    # Relative data paths (uploads, chat history spill) resolve under workdir
+    os.chdir(workdir)
+
+
+def print_table(rows):
+    print(f"{'stage':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'ops/s':>9}")
+    for stage, row in rows.items():
+        print(f"{stage:<16}{row['count']:>7}{row['errors']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}"
+              f"{row['p99_ms']:>10}{row['max_ms']:>10}{row['throughput_per_sec']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end onboarding load test against local mock LLM endpoints")
+    parser.add_argument("--candidates", type=int, default=20, help="Total candidates to simulate")
+    parser.add_argument("--concurrency", type=int, default=5, help="Candidates in flight at once")
+    parser.add_argument("--documents", type=int, default=2, help="Documents uploaded per candidate")
+    parser.add_argument("--shared-documents", action="store_true",
+                        help="Every candidate uploads the same bytes (exercises the report cache)")
+    parser.add_argument("--base-url", help="Use an already running mock server instead of starting one")
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay-ms", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    mock_config = None
+    base_url = args.base_url
+    if base_url is None:
+        mock_config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate,
+                                 args.token_delay_ms, seed=args.seed)
+        server, base_url = start_mock_server(mock_config)
+
+    output = args.output.resolve() if args.output else None
+    workdir = tempfile.mkdtemp(prefix="onboarding-loadtest-")
+    configure_environment(base_url.rstrip("/"), workdir)
+
+    from app.db_utils import load_nursing_license_registry
+
+    registry = load_nursing_license_registry()
+    documents = {}
+    for candidate in range(args.candidates):
+        seeds = [0 if args.shared_documents else candidate * args.documents + i for i in range(args.documents)]
+        documents[f"candidate-{candidate:04d}"] = [make_document_image(args.seed * 1_000_003 + s) for s in seeds]
+
+    recorder = StageRecorder()
+    failures = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(run_candidate, cid, docs, registry, recorder) for cid, docs in documents.items()]
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failures += 1
+                print(f"Candidate failed: {e}", file=sys.stderr)
+    wall_seconds = time.perf_counter() - start
+
+    rows = recorder.summary(wall_seconds)
+    print(f"{args.candidates} candidates, concurrency {args.concurrency}, {args.documents} documents each, "
+          f"{wall_seconds:.1f}s wall, {args.candidates / wall_seconds:.2f} candidates/s")
+    print_table(rows)
+    if mock_config is not None:
+        print(f"Mock server requests: {mock_config.requests}")
+    if failures:
+        print(f"{failures} candidates raised unexpectedly", file=sys.stderr)
+
+    if output:
+        output.write_text(json.dumps({
+            "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "wall_seconds": round(wall_seconds, 3),
+            "stages": rows,
+            "mock_requests": mock_config.requests if mock_config else None,
+        }, indent=2))
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
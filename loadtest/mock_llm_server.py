@@ -0,0 +1,184 @@
+"""
+Local stand-in for the Azure OpenAI and Groq chat-completions endpoints.
+
+Serves the routes used by app/validator.py (Azure deployments) and app/chatbot.py
+(Groq, streamed or not), with configurable latency, error rate and 429 rate.
+
+Usage:
+    python -m loadtest.mock_llm_server --port 8900 --latency-ms 800 --rate-limit-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AZURE_PATH = re.compile(r"^/openai/deployments/[^/]+/chat/completions")
+GROQ_PATH = "/openai/v1/chat/completions"
+
+MOCK_VALIDATION_REPORT = {
+    "document_type": "Nursing License",
+    "validation": {
+        field: {"status": "PASS", "notes": "Present and clear."}
+        for field in ["name", "date_of_birth", "license_number", "gender", "to_practice_as", "valid_until"]
+    },
+    "extracted_info": {
+        "name": "Sujata Sharma",
+        "date_of_birth": "20/08/1993",
+        "license_number": "12513",
+        "gender": "F",
+        "to_practice_as": "Midwife",
+        "valid_until": "30/06/2030",
+    },
+    "notes": "Generated by the mock server.",
+}
+MOCK_CHAT_REPLY = (
+    "Your nursing license was checked against the registry. If any field did not match, "
+    "please upload a clearer scan of the original document or ask to escalate to HR."
+)
+
+
+class MockConfig:
+    def __init__(self, latency_ms=500.0, jitter_ms=100.0, error_rate=0.0, rate_limit_rate=0.0,
+                 token_delay_ms=15.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.token_delay_ms = token_delay_ms
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {"azure": 0, "groq": 0, "errors": 0, "rate_limited": 0}
+
+    def outcome(self):
+        """Pick 'ok', 'error' or 'rate_limited' for one request."""
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            return "rate_limited"
+        if roll < self.rate_limit_rate + self.error_rate:
+            return "error"
+        return "ok"
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+    def count(self, key):
+        with self.lock:
+            self.requests[key] += 1
+
+
+def make_handler(config):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if AZURE_PATH.match(self.path):
+                endpoint = "azure"
+            elif self.path.startswith(GROQ_PATH):
+                endpoint = "groq"
+            else:
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                return
+            config.count(endpoint)
+
+            outcome = config.outcome()
+            if outcome == "rate_limited":
+                config.count("rate_limited")
+                self._send_json(429, {"error": {"message": "Rate limit exceeded"}}, {"Retry-After": "1"})
+                return
+            config.delay()
+            if outcome == "error":
+                config.count("errors")
+                self._send_json(500, {"error": {"message": "Injected server error"}})
+                return
+
+            if endpoint == "azure":
+                content = "```json\n" + json.dumps(MOCK_VALIDATION_REPORT) + "\n```"
+            else:
+                content = MOCK_CHAT_REPLY
+            if request.get("stream"):
+                self._stream(content)
+            else:
+                self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+        def _stream(self, content):
+            """Send content as server-sent events, one word per chunk."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for word in re.findall(r"\S+\s*", content):
+                self._chunk(f"data: {json.dumps({'choices': [{'delta': {'content': word}}]})}\n\n")
+                time.sleep(config.token_delay_ms / 1000)
+            self._chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _chunk(self, text):
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return MockHandler
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is expected under load; don't print tracebacks
+        pass
+
+
+def start_mock_server(config, host="127.0.0.1", port=0):
+    """Start the mock server on a background thread. Returns (server, base_url)."""
+    server = MockServer((host, port), make_handler(config))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=500.0, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--token-delay-ms", type=float, default=15.0, help="Delay between streamed tokens")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate, args.token_delay_ms)
+    server, base_url = start_mock_server(config, args.host, args.port)
+    print(f"Mock server listening on {base_url}")
+    print(f"  AZURE_OPENAI_API_BASE={base_url}")
+    print(f"  GROQ_API_BASE={base_url}/openai/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
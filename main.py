@@ -1,9 +1,19 @@
 import streamlit as st
-from app.ui import upload_section, chatbot_panel  
+from app.metrics import SessionTrace, set_session_trace, start_metrics_exporter
+from app.ui import upload_section, chatbot_panel, get_shared_resources
 
 st.set_page_config(page_title="AI Onboarding Copilot", layout="wide")
 st.title("🚀 Smart Onboarding & Compliance Copilot")
 
+# Registry, HTTP client, KB and validation workers are created once per process and shared by sessions
+get_shared_resources()
+
+# Export Prometheus metrics in the background, and collect this session's stage timings
+start_metrics_exporter()
+if "trace" not in st.session_state:
+    st.session_state.trace = SessionTrace()
+set_session_trace(st.session_state.trace)
+
 # Sidebar toggle for chatbot
 if "chatbot_open" not in st.session_state:
     st.session_state.chatbot_open = False
@@ -17,3 +27,27 @@ upload_section()
 # Conditionally show chatbot
 if st.session_state.chatbot_open:
     chatbot_panel()
+
+# Optional debug panel, rendered last so it includes this run's spans
+if st.sidebar.checkbox("🛠️ Show timing breakdown"):
+    breakdown = st.session_state.trace.breakdown()
+    st.sidebar.markdown("### Stage timings (this session)")
+    if breakdown:
+        st.sidebar.dataframe(
+            [{
+                "stage": row["stage"],
+                "count": row["count"],
+                "total ms": row["total_ms"],
+                "mean ms": row["mean_ms"],
+                "max ms": row["max_ms"],
+                "errors": row["errors"],
+                "KB sent": round(row["bytes_sent"] / 1024, 1),
+                "KB received": round(row["bytes_received"] / 1024, 1),
+            } for row in breakdown],
+            hide_index=True,
+        )
+    else:
+        st.sidebar.caption("No stages recorded yet.")
+    if st.sidebar.button("Reset timings"):
+        st.session_state.trace.clear()
+        st.rerun()
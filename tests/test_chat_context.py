@@ -0,0 +1,46 @@
+from app.chat_context import ChatContextManager, count_tokens, message_tokens, truncate_to_tokens
+
+
+def make_context(tmp_path, token_budget=200, summary_max_tokens=20):
+    return ChatContextManager("test", token_budget=token_budget, spill_dir=tmp_path,
+                              summary_max_tokens=summary_max_tokens)
+
+
+def test_truncate_to_tokens_fits_budget():
+    text = "word " * 100
+    truncated = truncate_to_tokens(text, 10)
+    assert count_tokens(truncated) <= 10
+    assert truncated.endswith("…")
+    assert truncate_to_tokens("short question?", 10) == "short question?"
+
+
+def test_recent_history_within_budget_is_kept_verbatim(tmp_path):
+    context = make_context(tmp_path)
+    context.append("user", "What was wrong with my license?")
+    context.append("assistant", "The expiry date could not be read.")
+    context.append("user", "How do I fix it?")
+
+    messages = context.build_messages("You are helpful.")
+
+    assert [m["content"] for m in messages[1:]] == [
+        "What was wrong with my license?", "The expiry date could not be read.", "How do I fix it?",
+    ]
+
+
+def test_over_budget_final_message_is_truncated_not_summarized(tmp_path):
+    context = make_context(tmp_path, token_budget=100)
+    context.append("user", "Earlier question about my contract.")
+    context.append("assistant", "Your contract is missing a signature.")
+    question = "Why did my license fail? " + "Here is the full text of the document. " * 50
+    context.append("user", question)
+
+    messages = context.build_messages("You are helpful.")
+
+    last = messages[-1]
+    assert last["role"] == "user"
+    assert last["content"].startswith("Why did my license fail?")
+    assert last["content"].endswith("…")
+    assert sum(message_tokens(m) for m in messages) <= 100
+    # Older turns that no longer fit are summarized; the question itself is not
+    summary = [m["content"] for m in messages if m["content"].startswith("Summary of the earlier conversation")]
+    assert summary and "Why did my license fail" not in summary[0]
@@ -0,0 +1,40 @@
+import pytest
+
+from app.checklist_state_manager import ChecklistStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChecklistStore(tmp_path / "checklists.db")
+
+
+LICENSE_RESULTS = {
+    "name": {"status": "PASS", "notes": ""},
+    "license_number": {"status": "FAIL", "notes": "Not readable."},
+}
+
+
+def test_update_is_persisted_per_candidate(store, tmp_path):
+    store.update("alice", "Nursing License", LICENSE_RESULTS, notes="first pass")
+
+    reopened = ChecklistStore(tmp_path / "checklists.db")
+    fields = reopened.load("alice")["Nursing License"]["required_fields"]
+    assert fields["name"] == "PASS" and fields["license_number"] == "FAIL"
+    # Other candidates still see the template
+    assert reopened.load("bob") == ChecklistStore(tmp_path / "other.db").load("bob")
+    assert reopened.candidates() == ["alice"]
+
+
+def test_revalidation_replaces_notes(store):
+    store.update("alice", "Nursing License", LICENSE_RESULTS, notes="first pass")
+    checklist = store.update("alice", "Nursing License", LICENSE_RESULTS, notes="second pass")
+
+    notes = checklist["Nursing License"]["notes"]
+    assert "second pass" in notes and "first pass" not in notes
+
+
+@pytest.mark.parametrize("document_type", [None, "Passport"])
+def test_unknown_document_type_is_rejected(store, document_type):
+    with pytest.raises(ValueError):
+        store.update("alice", document_type, LICENSE_RESULTS)
+    assert store.candidates() == []
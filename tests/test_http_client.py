@@ -0,0 +1,197 @@
+import io
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app import http_client
+from app.http_client import Base64JSONBody, CircuitBreaker, CircuitOpenError, HttpClient
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so connection reuse can be observed
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        with server.lock:
+            server.requests.append({"body": body, "client_port": self.client_address[1]})
+            status, headers = server.responses.pop(0) if server.responses else server.default_response
+        payload = b'{"ok": true}'
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Upstream stand-in answering POSTs with scripted (status, headers) responses, then default_response."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.responses = []
+        self.default_response = (200, {})
+
+    def handle_error(self, request, client_address):
+        pass
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/openai/v1/chat/completions"
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff delays instead of sleeping."""
+    delays = []
+    fake_time = types.SimpleNamespace(sleep=delays.append, monotonic=time.monotonic, perf_counter=time.perf_counter)
+    monkeypatch.setattr(http_client, "time", fake_time)
+    return delays
+
+
+def make_client(failure_threshold=5, reset_seconds=30, **kwargs):
+    client = HttpClient(**kwargs)
+    client._breakers["test"] = CircuitBreaker(failure_threshold, reset_seconds)
+    return client
+
+
+def test_retries_429_and_5xx_with_backoff(server, sleeps):
+    server.responses = [(429, {"Retry-After": "2"}), (503, {}), (502, {})]
+    client = make_client(max_retries=3, backoff_base=0.5, backoff_max=8)
+
+    response = client.post("test", server.url, json={"q": 1})
+
+    assert response.status_code == 200
+    assert len(server.requests) == 4
+    # Retry-After is honoured; otherwise full jitter over the capped exponential
+    assert sleeps[0] == 2
+    assert 0 <= sleeps[1] <= 1.0
+    assert 0 <= sleeps[2] <= 2.0
+
+
+def test_returns_last_response_when_retries_exhausted(server, sleeps):
+    server.default_response = (500, {})
+    client = make_client(max_retries=2)
+
+    response = client.post("test", server.url, json={})
+
+    assert response.status_code == 500
+    assert len(server.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_retry_after_is_capped(server, sleeps):
+    server.responses = [(429, {"Retry-After": "120"})]
+    client = make_client(max_retries=1, backoff_max=8)
+
+    client.post("test", server.url, json={})
+
+    assert sleeps == [8]
+
+
+def test_streamed_body_is_rewound_on_retry(server, sleeps):
+    server.responses = [(500, {}), (429, {})]
+    source = io.BytesIO(b"\x00\x01document bytes" * 10000)
+    body = Base64JSONBody({"image": "@@DATA@@"}, "@@DATA@@", source, len(source.getvalue()), chunk_size=999)
+    client = make_client(max_retries=3)
+
+    response = client.post("test", server.url, data=body, headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 200
+    bodies = [request["body"] for request in server.requests]
+    assert len(bodies) == 3
+    assert len(bodies[0]) == len(body)
+    assert bodies[0] == bodies[1] == bodies[2]
+
+
+def test_breaker_opens_half_opens_and_closes(server, sleeps):
+    server.default_response = (503, {})
+    client = make_client(failure_threshold=2, reset_seconds=0.2, max_retries=0)
+
+    client.post("test", server.url, json={})
+    client.post("test", server.url, json={})
+    with pytest.raises(CircuitOpenError):
+        client.post("test", server.url, json={})
+    assert len(server.requests) == 2
+
+    # Half-open: one trial goes through; its failure opens the circuit again
+    time.sleep(0.25)
+    assert client.post("test", server.url, json={}).status_code == 503
+    with pytest.raises(CircuitOpenError):
+        client.post("test", server.url, json={})
+
+    # A successful trial closes it
+    time.sleep(0.25)
+    server.default_response = (200, {})
+    assert client.post("test", server.url, json={}).status_code == 200
+    assert client.post("test", server.url, json={}).status_code == 200
+    assert len(server.requests) == 5
+
+
+def test_breaker_counts_each_request_once(server, sleeps):
+    server.default_response = (500, {})
+    client = make_client(failure_threshold=2, max_retries=3)
+
+    client.post("test", server.url, json={})
+
+    # Four failed attempts, but only one failed request
+    assert len(server.requests) == 4
+    assert client.breaker("test").allow()
+
+
+def test_trial_raising_other_exception_does_not_wedge_breaker(server, sleeps, monkeypatch):
+    client = make_client(failure_threshold=1, reset_seconds=0.1, max_retries=0)
+    server.default_response = (500, {})
+    client.post("test", server.url, json={})
+
+    def broken_post(*args, **kwargs):
+        raise requests.exceptions.ChunkedEncodingError("connection broken mid-body")
+
+    time.sleep(0.15)
+    with monkeypatch.context() as patch:
+        patch.setattr(client.session, "post", broken_post)
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            client.post("test", server.url, json={})
+
+    # The failed trial reopened the circuit; after the reset a new trial is allowed
+    with pytest.raises(CircuitOpenError):
+        client.post("test", server.url, json={})
+    time.sleep(0.15)
+    server.default_response = (200, {})
+    assert client.post("test", server.url, json={}).status_code == 200
+
+
+def test_connections_are_reused(server, sleeps):
+    server.responses = [(503, {})]
+    client = make_client(max_retries=1)
+
+    for _ in range(3):
+        client.post("test", server.url, json={"n": 1})
+
+    # Four requests (one retried) over a single keep-alive connection
+    assert len(server.requests) == 4
+    assert len({request["client_port"] for request in server.requests}) == 1
@@ -0,0 +1,130 @@
+import sqlite3
+import time
+
+import pytest
+
+from app import job_queue
+from app.job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue, JobWorkerPool
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.db", lease_seconds=0.2, max_attempts=2)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BACKOFF_BASE", 0)
+
+
+def test_expired_lease_is_reclaimed(queue):
+    job_id = queue.enqueue("k", {"n": 1})
+
+    first = queue.claim("worker-a")
+    assert first["id"] == job_id and first["attempts"] == 1
+    # Leased and still fresh: nobody else gets it
+    assert queue.claim("worker-b") is None
+
+    time.sleep(0.3)
+    second = queue.claim("worker-b")
+    assert second["id"] == job_id and second["attempts"] == 2 and second["lease_owner"] == "worker-b"
+
+    # The first worker lost its lease and cannot record a result
+    assert not queue.complete(job_id, "worker-a", {"from": "a"})
+    assert queue.complete(job_id, "worker-b", {"from": "b"})
+    job = queue.get(job_id)
+    assert job["status"] == DONE and job["result"] == {"from": "b"}
+
+
+def test_renewed_lease_is_not_reclaimed(queue):
+    job_id = queue.enqueue("k", {})
+    queue.claim("worker-a")
+    for _ in range(3):
+        time.sleep(0.1)
+        queue.renew([job_id], "worker-a")
+    assert queue.claim("worker-b") is None
+
+
+def test_failed_job_is_retried_until_max_attempts(queue, no_backoff):
+    job_id = queue.enqueue("k", {})
+
+    queue.claim("w")
+    assert queue.fail(job_id, "w", "boom 1")
+    job = queue.get(job_id)
+    assert job["status"] == QUEUED and job["error"] == "boom 1"
+
+    assert queue.claim("w")["attempts"] == 2
+    assert queue.fail(job_id, "w", "boom 2", {"error": "boom 2"})
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and job["result"] == {"error": "boom 2"} and job["finished_at"]
+    assert queue.claim("w") is None
+
+
+def test_failed_attempt_waits_for_backoff(queue):
+    job_id = queue.enqueue("k", {})
+    queue.claim("w")
+    queue.fail(job_id, "w", "boom")
+    assert queue.get(job_id)["available_at"] > time.time()
+    assert queue.claim("w") is None
+
+
+def test_dedup_reuses_pending_and_done_jobs_but_not_failed(queue, no_backoff):
+    job_id = queue.enqueue("k", {"path": "a"}, dedup_key="abc")
+    assert queue.enqueue("k", {"path": "a"}, dedup_key="abc") == job_id
+    assert queue.enqueue("other", {"path": "a"}, dedup_key="abc") != job_id
+
+    queue.claim("w", kinds=["k"])
+    queue.complete(job_id, "w", {"ok": True})
+    assert queue.enqueue("k", {"path": "a"}, dedup_key="abc") == job_id
+
+    failed_id = queue.enqueue("k", {}, dedup_key="xyz", max_attempts=1)
+    queue.claim("w", kinds=["k"])
+    queue.fail(failed_id, "w", "boom")
+    assert queue.get(failed_id)["status"] == FAILED
+    assert queue.enqueue("k", {}, dedup_key="xyz") != failed_id
+
+
+def test_batch_is_applied_once(queue):
+    job_ids = [queue.enqueue("k", {"n": n}) for n in range(3)]
+    batch_id = queue.create_batch("cand", job_ids)
+
+    assert [job["id"] for job in queue.batch_jobs(batch_id)] == job_ids
+    assert queue.latest_batch("cand") == batch_id
+    assert queue.mark_batch_applied(batch_id)
+    assert not queue.mark_batch_applied(batch_id)
+
+
+def test_worker_pool_runs_jobs_and_survives_database_errors(queue, no_backoff):
+    calls = []
+    original_complete = queue.complete
+
+    def flaky_complete(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return original_complete(*args)
+
+    queue.complete = flaky_complete
+    handlers = {"ok": lambda payload: {"doubled": payload["n"] * 2}, "bad": lambda payload: 1 / 0}
+    ok_id = queue.enqueue("ok", {"n": 21})
+    bad_id = queue.enqueue("bad", {})
+
+    pool = JobWorkerPool(queue, handlers, workers=1, poll_seconds=0.05).start()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            if queue.get(ok_id)["status"] == DONE and queue.get(bad_id)["status"] == FAILED:
+                break
+            time.sleep(0.05)
+        workers_alive = [thread.is_alive() for thread in pool._threads]
+    finally:
+        pool.stop(timeout=2)
+
+    # The lost completion was re-run after the lease expired, on the same (live) worker thread
+    assert queue.get(ok_id)["result"] == {"doubled": 42}
+    assert len(calls) == 2
+    bad = queue.get(bad_id)
+    assert bad["status"] == FAILED and bad["error"].startswith("ZeroDivisionError")
+    assert bad["attempts"] == 2
+    assert all(workers_alive)
+    assert queue.counts().get(RUNNING, 0) == 0
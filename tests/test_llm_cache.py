@@ -0,0 +1,69 @@
+import threading
+
+from app.llm_cache import LLMResponseCache
+
+
+def test_concurrent_callers_share_one_upstream_call():
+    cache = LLMResponseCache(db_path="")
+    leader_started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        leader_started.set()
+        release.wait(5)
+        return "answer"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cache.get_or_compute("q", "m", 0.0, compute)))
+    first.start()
+    assert leader_started.wait(5)
+    second = threading.Thread(target=lambda: results.append(cache.get_or_compute("q", "m", 0.0, compute)))
+    second.start()
+    second.join(0.2)
+    # The follower is waiting on the leader rather than calling upstream itself
+    assert second.is_alive()
+
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert results == ["answer", "answer"]
+    assert len(calls) == 1
+    assert cache.get_or_compute("q", "m", 0.0, compute) == "answer"
+    assert len(calls) == 1
+
+
+def test_leader_error_reaches_followers_and_is_not_cached():
+    cache = LLMResponseCache(db_path="")
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    for _ in range(2):
+        try:
+            cache.get_or_compute("q", "m", 0.0, failing)
+        except RuntimeError:
+            pass
+    assert len(calls) == 2
+    assert cache.get_or_compute("q", "m", 0.0, lambda: "recovered") == "recovered"
+
+
+def test_uncacheable_results_are_returned_but_not_stored():
+    cache = LLMResponseCache(db_path="")
+    not_error = lambda value: not value.startswith("Error")
+    assert cache.get_or_compute("q", "m", 0.0, lambda: "Error: 500", cacheable=not_error) == "Error: 500"
+    assert cache.get_or_compute("q", "m", 0.0, lambda: "fine") == "fine"
+
+
+def test_prompts_differing_only_in_whitespace_share_an_entry(tmp_path):
+    cache = LLMResponseCache(db_path=str(tmp_path / "llm.db"))
+    cache.get_or_compute("what  is\nwrong?", "m", 0.0, lambda: "first")
+    assert cache.get_or_compute("what is wrong?", "m", 0.0, lambda: "second") == "first"
+
+    # Persisted entries are visible to another cache instance (e.g. another process)
+    other = LLMResponseCache(db_path=str(tmp_path / "llm.db"))
+    assert other.get_or_compute("what is wrong?", "m", 0.0, lambda: "third") == "first"
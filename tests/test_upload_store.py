@@ -0,0 +1,82 @@
+import importlib
+import io
+import os
+
+import pytest
+
+
+@pytest.fixture
+def handlers(tmp_path, monkeypatch):
+    # app.handlers creates its default upload folder relative to the working directory on import
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module("app.handlers")
+
+
+@pytest.fixture
+def store(handlers, tmp_path):
+    return handlers.UploadStore(blob_dir=tmp_path / "blobs", index_path=tmp_path / "uploads.db",
+                                max_bytes=10 ** 9, max_age_seconds=3600, min_age_seconds=0)
+
+
+def upload(name, data):
+    file = io.BytesIO(data)
+    file.name = name
+    file.size = len(data)
+    return file
+
+
+def refcount(store, path):
+    with store._conn() as conn:
+        row = conn.execute("SELECT refcount FROM blobs WHERE sha256 = ?", (os.path.basename(path),)).fetchone()
+    return row[0] if row else None
+
+
+def test_identical_uploads_share_one_blob(store):
+    first = store.save(upload("license.pdf", b"same bytes"), "alice")
+    second = store.save(upload("scan.pdf", b"same bytes"), "bob")
+
+    assert first == second
+    assert refcount(store, first) == 2
+    assert store.stats() == {"blobs": 1, "bytes": len(b"same bytes"), "manifest_entries": 2}
+
+
+def test_resaving_same_file_does_not_add_a_reference(store):
+    path = store.save(upload("license.pdf", b"v1"), "alice")
+    store.save(upload("license.pdf", b"v1"), "alice")
+    assert refcount(store, path) == 1
+
+
+def test_replaced_blob_is_swept_once_unreferenced(store):
+    old_path = store.save(upload("license.pdf", b"first scan"), "alice")
+    shared_path = store.save(upload("contract.pdf", b"contract"), "alice")
+    store.save(upload("contract.pdf", b"contract"), "bob")
+
+    # Re-uploading under the same name moves alice's reference to the new blob
+    new_path = store.save(upload("license.pdf", b"second, clearer scan"), "alice")
+    assert refcount(store, old_path) == 0
+
+    result = store.sweep()
+
+    assert result == {"evicted": 1, "bytes_freed": len(b"first scan")}
+    assert not os.path.exists(old_path)
+    assert os.path.exists(new_path) and os.path.exists(shared_path)
+    assert store.manifest("alice") == {"contract.pdf": shared_path, "license.pdf": new_path}
+
+
+def test_sweep_evicts_least_recently_used_over_size_limit(store, handlers, tmp_path):
+    small = handlers.UploadStore(blob_dir=tmp_path / "blobs", index_path=tmp_path / "uploads.db",
+                                 max_bytes=10, max_age_seconds=3600, min_age_seconds=0)
+    older = small.save(upload("a.pdf", b"x" * 8), "alice")
+    newer = small.save(upload("b.pdf", b"y" * 8), "alice")
+
+    assert small.sweep()["evicted"] == 1
+    assert not os.path.exists(older) and os.path.exists(newer)
+    assert small.manifest("alice") == {"b.pdf": newer}
+
+
+def test_recently_used_blobs_survive_sweep(handlers, tmp_path):
+    store = handlers.UploadStore(blob_dir=tmp_path / "blobs", index_path=tmp_path / "uploads.db",
+                                 max_bytes=1, max_age_seconds=0, min_age_seconds=3600)
+    path = store.save(upload("a.pdf", b"fresh"), "alice")
+    assert store.sweep()["evicted"] == 0
+    assert os.path.exists(path)